@@ -32,7 +32,6 @@ class Application:
             '--python-flag=nosite',
             f'--python-for-scons={sys.executable}',
             '--assume-yes-for-downloads',
-            '--plugin-enable=multiprocessing',
             '--show-progress',
             '--file-reference-choice=runtime'
         ]
@@ -55,8 +54,10 @@ class Application:
             'libcrypto-1_1.dll',
             'libssl-1_1.dll',
             'python38.dll',
+            '_asyncio.pyd',
             '_elementpath.pyd',
-            '_multiprocessing.pyd',
+            '_frame.pyd',
+            '_overlapped.pyd',
             '_psutil_windows.pyd',
             '_queue.pyd',
             '_socket.pyd',
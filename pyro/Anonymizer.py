@@ -1,5 +1,6 @@
+import hashlib
 import logging
-import os
+import mmap
 import random
 import string
 
@@ -16,48 +17,68 @@ class Anonymizer:
         return ''.join(random.choice(charset) for _ in range(size))
 
     @staticmethod
-    def anonymize_script(path: str) -> None:
+    def _derive_str(seed: bytes, salt: str, size: int, uppercase: bool = False) -> str:
+        """Returns string derived from seed, so that the same seed always produces the same string"""
+        charset = string.ascii_uppercase if uppercase else string.ascii_lowercase
+        digest: bytes = hashlib.shake_256(seed + salt.encode('ascii')).digest(size)
+        return ''.join(charset[b % len(charset)] for b in digest)
+
+    @staticmethod
+    def anonymize_script(path: str, seed: bytes = b'') -> bool:
         """
         Obfuscates script path, user name, and computer name in compiled script
+
+        When seed is given, replacement strings are derived from the seed instead of being random.
+        Returns True if script was anonymized.
         """
         try:
-            header: PexHeader = PexReader.get_header(path)
-        except ValueError:
-            Anonymizer.log.error(f'Cannot anonymize script due to unknown file magic: "{path}"')
-            return
+            with open(path, mode='r+b') as f, mmap.mmap(f.fileno(), 0) as data:
+                try:
+                    header: PexHeader = PexReader.decode_header(data, path)
+                except (ValueError, EOFError):
+                    Anonymizer.log.error(f'Cannot anonymize script due to unknown file magic: "{path}"')
+                    return False
+
+                file_path: str = header.script_path.value
+                user_name: str = header.user_name.value
+                computer_name: str = header.computer_name.value
+
+                if '.' not in file_path:
+                    Anonymizer.log.warning(f'Cannot anonymize script again: "{path}"')
+                    return False
 
-        file_path: str = header.script_path.value
-        user_name: str = header.user_name.value
-        computer_name: str = header.computer_name.value
+                if not file_path.casefold().endswith('.psc'):
+                    Anonymizer.log.warning(f'Cannot anonymize script due to invalid file extension: "{path}"')
+                    return False
 
-        if '.' not in file_path:
-            Anonymizer.log.warning(f'Cannot anonymize script again: "{path}"')
-            return
+                if not len(file_path) > 0:
+                    Anonymizer.log.warning(f'Cannot anonymize script due to zero-length file path: "{path}"')
+                    return False
 
-        if not file_path.casefold().endswith('.psc'):
-            Anonymizer.log.warning(f'Cannot anonymize script due to invalid file extension: "{path}"')
-            return
+                if not len(user_name) > 0:
+                    Anonymizer.log.warning(f'Cannot anonymize script due to zero-length user name: "{path}"')
+                    return False
 
-        if not len(file_path) > 0:
-            Anonymizer.log.warning(f'Cannot anonymize script due to zero-length file path: "{path}"')
-            return
+                if not len(computer_name) > 0:
+                    Anonymizer.log.warning(f'Cannot anonymize script due to zero-length computer name: "{path}"')
+                    return False
 
-        if not len(user_name) > 0:
-            Anonymizer.log.warning(f'Cannot anonymize script due to zero-length user name: "{path}"')
-            return
+                for name, uppercase in (('script_path', False), ('user_name', False), ('computer_name', True)):
+                    field = getattr(header, name)
+                    size: int = len(field.data)
 
-        if not len(computer_name) > 0:
-            Anonymizer.log.warning(f'Cannot anonymize script due to zero-length computer name: "{path}"')
-            return
+                    if seed:
+                        value: str = Anonymizer._derive_str(seed, name, size, uppercase)
+                    else:
+                        value = Anonymizer._randomize_str(size, uppercase)
 
-        with open(path, mode='r+b') as f:
-            f.seek(header.script_path.offset, os.SEEK_SET)
-            f.write(bytes(Anonymizer._randomize_str(header.script_path_size.value), encoding='ascii'))
+                    data[field.offset:field.offset + size] = value.encode('ascii')
 
-            f.seek(header.user_name.offset, os.SEEK_SET)
-            f.write(bytes(Anonymizer._randomize_str(header.user_name_size.value), encoding='ascii'))
+                data.flush()
+        except (OSError, ValueError) as e:
+            Anonymizer.log.error(f'Cannot anonymize script: "{path}" ({e})')
+            return False
 
-            f.seek(header.computer_name.offset, os.SEEK_SET)
-            f.write(bytes(Anonymizer._randomize_str(header.computer_name_size.value, True), encoding='ascii'))
+        Anonymizer.log.info(f'Anonymized "{path}"...')
 
-            Anonymizer.log.info(f'Anonymized "{path}"...')
+        return True
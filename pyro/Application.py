@@ -3,12 +3,18 @@ import logging
 import os
 import sys
 
+from lxml import etree
+
 from pyro.Enums.BuildEvent import BuildEvent
 from pyro.BuildFacade import BuildFacade
-from pyro.Comparators import startswith
+from pyro.Comparators import (endswith,
+                              is_package_node,
+                              is_zipfile_node,
+                              startswith)
+from pyro.FileWatcher import FileWatcher
 from pyro.PapyrusProject import PapyrusProject
 from pyro.PathHelper import PathHelper
-from pyro.PexReader import PexReader
+from pyro.PexFile import PexFile
 from pyro.ProjectOptions import ProjectOptions
 
 
@@ -18,10 +24,13 @@ class Application:
 
     args: argparse.Namespace = None
 
-    def __init__(self, parser: argparse.ArgumentParser) -> None:
+    def __init__(self, parser: argparse.ArgumentParser, argv: list = None, projects: dict = None) -> None:
         self.parser = parser
 
-        self.args = self.parser.parse_args()
+        self.args = self.parser.parse_args(argv)
+
+        # projects loaded by earlier builds in a build server, or None
+        self.projects = projects
 
         if self.args.show_help:
             self._print_help_and_exit()
@@ -83,13 +92,48 @@ class Application:
         _, extension = os.path.splitext(os.path.basename(self.args.input_path).casefold())
 
         if extension == '.pex':
-            header = PexReader.dump(self.args.input_path)
+            header = PexFile.dump(self.args.input_path)
             Application.log.info(f'Dumping: "{self.args.input_path}"\n{header}')
             sys.exit(0)
         elif extension not in ('.ppj', '.pyroproject'):
             Application.log.error('Cannot proceed without PPJ file path')
             self._print_help_and_exit()
 
+        ppj = self._get_project()
+
+        self._build(ppj)
+
+        if self.args.watch:
+            self._watch(ppj)
+
+        return 0
+
+    def _get_project(self) -> PapyrusProject:
+        """Returns project loaded by an earlier build and updated for changed files, or loads project"""
+        if self.projects is None:
+            return self._load_project()
+
+        key: str = repr(sorted(self.args.__dict__.items()))
+
+        if key in self.projects:
+            ppj, watcher = self.projects[key]
+
+            changed_paths: list = self._filter_changes(ppj, watcher.poll())
+
+            if not self._requires_reload(ppj, changed_paths):
+                if changed_paths:
+                    Application.log.info(f'{len(changed_paths)} changed files detected.')
+                    ppj.refresh(changed_paths)
+                return ppj
+
+            watcher.close()
+
+        ppj = self._load_project()
+        self.projects[key] = (ppj, FileWatcher(*self._get_watch_paths(ppj)))
+
+        return ppj
+
+    def _load_project(self) -> PapyrusProject:
         options = ProjectOptions(self.args.__dict__)
         ppj = PapyrusProject(options)
 
@@ -103,10 +147,19 @@ class Application:
         for _, path in ppj.psc_paths.items():
             Application.log.info(f'+ "{path}"')
 
+        return ppj
+
+    def _build(self, ppj: PapyrusProject, changed_paths: list = None) -> BuildFacade:
+        """
+        Compiles scripts and creates packages and zip files
+
+        When rebuilding for changed paths, packages and zip files are created only if
+        scripts were compiled or other files changed.
+        """
         build = BuildFacade(ppj)
 
         # bsarch path is not set until BuildFacade initializes
-        if ppj.options.package and not os.path.isfile(ppj.options.bsarch_path):
+        if ppj.options.package and ppj.options.use_bsarch and not os.path.isfile(ppj.options.bsarch_path):
             Application.log.error('Cannot proceed with Package enabled without valid BSArch path')
             self._print_help_and_exit()
 
@@ -114,30 +167,45 @@ class Application:
 
         build.try_compile()
 
+        repackage: bool = changed_paths is None or bool(build.compiled_paths) \
+            or any(not endswith(path, '.psc', ignorecase=True) for path in changed_paths)
+
         if ppj.options.anonymize:
             if build.failed_count == 0 or ppj.options.ignore_errors:
                 build.try_anonymize()
             else:
                 Application.log.warning(f'Cannot anonymize scripts because {build.failed_count} scripts failed to compile')
+                build.discard_compiled(build.compiled_paths)
         else:
             Application.log.warning('Cannot anonymize scripts because Anonymize is disabled in project')
 
+        create_packages: bool = False
+        create_zip_files: bool = False
+
         if ppj.options.package:
-            if build.failed_count == 0 or ppj.options.ignore_errors:
-                build.try_pack()
+            if not repackage:
+                Application.log.info('Skipping Packages because their inputs have not changed')
+            elif build.failed_count == 0 or ppj.options.ignore_errors:
+                create_packages = True
             else:
                 Application.log.warning(f'Cannot create Packages because {build.failed_count} scripts failed to compile')
         else:
             Application.log.warning('Cannot create Packages because Package is disabled in project')
 
         if ppj.options.zip:
-            if build.failed_count == 0 or ppj.options.ignore_errors:
-                build.try_zip()
+            if not repackage:
+                Application.log.info('Skipping ZipFile because its inputs have not changed')
+            elif build.failed_count == 0 or ppj.options.ignore_errors:
+                create_zip_files = True
             else:
                 Application.log.warning(f'Cannot create ZipFile because {build.failed_count} scripts failed to compile')
         else:
             Application.log.warning('Cannot create ZipFile because Zip is disabled in project')
 
+        # packages and zip files are independent, so they are created together
+        if create_packages or create_zip_files:
+            build.try_pack(create_packages, create_zip_files)
+
         Application.log.info(build.build_time if build.success_count > 0 else 'No scripts were compiled.')
 
         Application.log.info('DONE!')
@@ -145,4 +213,113 @@ class Application:
         if build.failed_count == 0:
             build.try_build_event(BuildEvent.POST)
 
-        return 0
+        return build
+
+    @staticmethod
+    def _get_watch_paths(ppj: PapyrusProject) -> tuple:
+        """
+        Returns folders containing project inputs and import folders outside them,
+        excluding folders inside other folders
+        """
+        folder_paths: list = [ppj.project_path]
+
+        for parent_node, is_child_node in ((ppj.packages_node, is_package_node), (ppj.zip_files_node, is_zipfile_node)):
+            if parent_node is not None:
+                folder_paths.extend(node.get('RootDir') for node in filter(is_child_node, parent_node) if node.get('RootDir'))
+
+        project_paths: list = []
+        import_paths: list = []
+
+        for paths, results in ((folder_paths, project_paths), (ppj.import_paths, import_paths)):
+            for folder_path in sorted({os.path.normpath(path) for path in paths}, key=len):
+                if not any(startswith(os.path.join(folder_path, ''), os.path.join(path, ''), ignorecase=True)
+                           for path in project_paths + import_paths):
+                    results.append(folder_path)
+
+        return project_paths, import_paths
+
+    @staticmethod
+    def _get_ignored_paths(ppj: PapyrusProject) -> tuple:
+        """Returns folders that Pyro writes to, so that builds do not trigger themselves"""
+        folder_paths: list = [ppj.options.output_path,
+                              ppj.options.temp_path,
+                              os.path.dirname(ppj.get_manifest_path()),
+                              os.path.dirname(ppj.get_snapshot_path())]
+
+        if ppj.options.package:
+            folder_paths.append(ppj.options.package_path)
+        if ppj.options.zip:
+            folder_paths.append(ppj.options.zip_output_path)
+
+        return tuple(os.path.join(os.path.normpath(path), '') for path in folder_paths if path)
+
+    def _filter_changes(self, ppj: PapyrusProject, changed_paths: set) -> list:
+        """Returns changed paths excluding compiled scripts and files that Pyro writes"""
+        ignored_paths: tuple = self._get_ignored_paths(ppj)
+
+        return [path for path in changed_paths
+                if not startswith(path, ignored_paths, ignorecase=True)
+                and not endswith(path, ('.pex', '.tmp'), ignorecase=True)]
+
+    def _watch(self, ppj: PapyrusProject) -> None:
+        """Rebuilds project whenever its inputs change, reusing the loaded project between builds"""
+        watcher = FileWatcher(*self._get_watch_paths(ppj))
+
+        Application.log.info(f'Watching {len(watcher.folder_paths)} folders for changes '
+                             f'({"inotify" if watcher.uses_inotify else "polling"})... Press Ctrl+C to stop.')
+
+        try:
+            while True:
+                changed_paths: list = self._filter_changes(ppj, watcher.wait())
+
+                if not changed_paths:
+                    continue
+
+                Application.log.info(f'{len(changed_paths)} changed files detected.')
+
+                if self._requires_reload(ppj, changed_paths):
+                    Application.log.info('Reloading project...')
+                    try:
+                        ppj = self._load_project()
+                    except (SystemExit, etree.XMLSyntaxError) as e:
+                        Application.log.error(f'Cannot reload project, waiting for further changes... ({e})')
+                        continue
+
+                    watcher.close()
+                    watcher = FileWatcher(*self._get_watch_paths(ppj))
+
+                    self._build(ppj)
+                    continue
+
+                ppj.refresh(changed_paths)
+
+                self._build(ppj, changed_paths)
+        except KeyboardInterrupt:
+            Application.log.info('Stopped watching for changes.')
+        finally:
+            watcher.close()
+
+    @staticmethod
+    def _requires_reload(ppj: PapyrusProject, changed_paths: list) -> bool:
+        """Returns True if changes may add or remove scripts, change the project itself, or are unknown"""
+        input_path: str = os.path.normcase(ppj.options.input_path)
+
+        for path in changed_paths:
+            # reloading discards cached file hashes, which cannot be invalidated for unknown changes
+            if path == FileWatcher.overflow_path:
+                return True
+
+            if os.path.normcase(path) == input_path:
+                return True
+
+            if not endswith(path, '.psc', ignorecase=True):
+                continue
+
+            # new, deleted, and renamed scripts change which scripts are compiled and how names resolve
+            if not os.path.isfile(path):
+                return True
+
+            if ppj.dependency_graph is None or not ppj.dependency_graph.get_key(path):
+                return True
+
+        return False
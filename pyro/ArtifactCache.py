@@ -0,0 +1,105 @@
+import logging
+import os
+import shutil
+import uuid
+
+
+class ArtifactCache:
+    """
+    Content-addressed store of compiled scripts shared by every project on the machine
+
+    Artifacts are stored by compile key, which is derived from the contents of every
+    input to the compiler, so an artifact can be restored into any project checkout
+    that compiles the same inputs. Least recently used artifacts are evicted when the
+    cache exceeds its size limit.
+    """
+    log: logging.Logger = logging.getLogger('pyro')
+
+    def __init__(self, path: str, size_limit: int) -> None:
+        self.path: str = path
+        self.size_limit: int = size_limit
+
+    def _get_artifact_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f'{key}.pex')
+
+    def get(self, key: str, target_path: str) -> bool:
+        """Copies artifact for key to target path and returns True, or returns False if not cached"""
+        artifact_path: str = self._get_artifact_path(key)
+
+        try:
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            # artifacts are copied, not linked, because compiled scripts may be modified in place later
+            shutil.copyfile(artifact_path, target_path)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            ArtifactCache.log.warning(f'Cannot restore artifact from cache: "{artifact_path}" ({e.strerror})')
+            return False
+
+        # modification time tracks last use for eviction
+        try:
+            os.utime(artifact_path)
+        except OSError:
+            pass
+
+        return True
+
+    def put(self, key: str, source_path: str) -> None:
+        """Stores copy of compiled script under key"""
+        artifact_path: str = self._get_artifact_path(key)
+
+        if os.path.isfile(artifact_path):
+            return
+
+        # unique name so concurrent builds from other checkouts never write the same file
+        temp_path = f'{artifact_path}.{uuid.uuid4().hex}.tmp'
+
+        try:
+            os.makedirs(os.path.dirname(artifact_path), exist_ok=True)
+            shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, artifact_path)
+        except OSError as e:
+            ArtifactCache.log.warning(f'Cannot store artifact in cache: "{artifact_path}" ({e.strerror})')
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def evict(self) -> None:
+        """Removes least recently used artifacts until cache fits within size limit"""
+        artifacts: list = []
+        cache_size: int = 0
+
+        try:
+            folders = [entry for entry in os.scandir(self.path) if entry.is_dir()]
+        except OSError:
+            return
+
+        for folder in folders:
+            try:
+                for entry in os.scandir(folder.path):
+                    if entry.name.endswith('.pex') and entry.is_file():
+                        stat = entry.stat()
+                        artifacts.append((stat.st_mtime, stat.st_size, entry.path))
+                        cache_size += stat.st_size
+            except OSError:
+                continue
+
+        if cache_size <= self.size_limit:
+            return
+
+        artifacts.sort()
+
+        evicted_count: int = 0
+
+        for _, artifact_size, artifact_path in artifacts:
+            if cache_size <= self.size_limit:
+                break
+            try:
+                os.remove(artifact_path)
+            except OSError:
+                continue
+            cache_size -= artifact_size
+            evicted_count += 1
+
+        ArtifactCache.log.info(f'Evicted {evicted_count} least recently used artifacts from cache.')
@@ -0,0 +1,312 @@
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Deque, List, NamedTuple, Tuple
+
+
+class Ba2Chunk(NamedTuple):
+    offset: int
+    size: int
+    start_mip: int
+    end_mip: int
+
+
+class Ba2File(NamedTuple):
+    source_path: str
+    archive_path: str
+    name_hash: int
+    extension: bytes
+    folder_hash: int
+    # texture header fields, unused in general archives
+    height: int = 0
+    width: int = 0
+    mip_count: int = 0
+    dxgi_format: int = 0
+    is_cubemap: bool = False
+    chunks: Tuple[Ba2Chunk, ...] = ()
+
+
+class Ba2Writer:
+    """
+    Writes Fallout 4 general (GNRL) and texture (DX10) archives from files at their source paths
+
+    Textures are stored without their DDS headers and split into chunks by mip level. Chunks are
+    compressed on a thread pool and written in archive order.
+    """
+    GNRL: bytes = b'GNRL'
+    DX10: bytes = b'DX10'
+
+    version: int = 1
+
+    header_size: int = 24
+    general_record_size: int = 36
+    texture_record_size: int = 24
+    chunk_record_size: int = 24
+
+    general_record_flags: int = 0x00100100
+    record_sentinel: int = 0xBAADF00D
+
+    # mips larger than this get their own chunk, and smaller mips share the last chunk
+    chunk_mip_size: int = 512
+
+    # bytes per 4x4 block for block compressed formats, and bits per pixel otherwise
+    dxgi_block_sizes: dict = {
+        **dict.fromkeys((70, 71, 72, 79, 80, 81), 8),
+        **dict.fromkeys((73, 74, 75, 76, 77, 78, 82, 83, 84, 94, 95, 96, 97, 98, 99), 16),
+    }
+    dxgi_pixel_sizes: dict = {
+        **dict.fromkeys((27, 28, 29, 30, 31, 32, 87, 88, 90, 91, 92, 93), 32),
+        **dict.fromkeys((48, 49, 50, 51, 52, 85, 86), 16),
+        **dict.fromkeys((60, 61, 62, 63, 64, 65), 8),
+    }
+
+    # dxgi formats of legacy DDS headers
+    four_cc_formats: dict = {
+        b'DXT1': 71,
+        b'DXT3': 74,
+        b'DXT5': 77,
+        b'ATI1': 80,
+        b'BC4U': 80,
+        b'BC4S': 81,
+        b'ATI2': 83,
+        b'BC5U': 83,
+        b'BC5S': 84,
+    }
+
+    # limits how far compression can run ahead of writing, in chunks per worker
+    pending_chunks_per_worker: int = 4
+
+    def __init__(self, *, compress: bool = True, worker_limit: int = 0) -> None:
+        self.compress: bool = compress
+        self.worker_limit: int = worker_limit or os.cpu_count() or 1
+
+    @staticmethod
+    def get_hash(name: str) -> int:
+        """Returns hash of lowercase, backslash-separated folder path or file name without extension"""
+        # the games use crc32 without pre and post conditioning
+        return zlib.crc32(name.encode('cp1252'), 0xFFFFFFFF) ^ 0xFFFFFFFF
+
+    @staticmethod
+    def is_texture_archive(files: List[Tuple[str, str]]) -> bool:
+        """Returns True if files should be written to a texture archive"""
+        return bool(files) and all(archive_path.lower().endswith('.dds') for _, archive_path in files)
+
+    @staticmethod
+    def _get_mip_size(width: int, height: int, dxgi_format: int) -> int:
+        """Returns size of mip level in bytes, or 0 if format is not supported"""
+        block_size: int = Ba2Writer.dxgi_block_sizes.get(dxgi_format, 0)
+        if block_size:
+            return max(1, (width + 3) // 4) * max(1, (height + 3) // 4) * block_size
+
+        return width * height * Ba2Writer.dxgi_pixel_sizes.get(dxgi_format, 0) // 8
+
+    @staticmethod
+    def _get_legacy_format(pixel_format: tuple) -> int:
+        """Returns dxgi format of legacy DDS pixel format, or 0 if format is not supported"""
+        flags, four_cc, bit_count, red_mask = pixel_format[1], pixel_format[2], pixel_format[3], pixel_format[4]
+
+        # DDPF_FOURCC
+        if flags & 0x4:
+            return Ba2Writer.four_cc_formats.get(four_cc, 0)
+
+        # DDPF_RGB
+        if flags & 0x40 and bit_count == 32:
+            if red_mask == 0xFF:
+                return 28
+            # DDPF_ALPHAPIXELS
+            return 87 if flags & 0x1 else 88
+
+        # DDPF_LUMINANCE
+        if flags & 0x20000 and bit_count == 8:
+            return 61
+
+        return 0
+
+    def _read_texture(self, source_path: str, archive_path: str, name_hash: int, extension: bytes, folder_hash: int) -> Ba2File:
+        """Returns texture record from DDS header with chunks for mip levels"""
+        with open(source_path, mode='rb') as f:
+            header: bytes = f.read(148)
+            file_size: int = os.fstat(f.fileno()).st_size
+
+        if len(header) < 128 or header[:4] != b'DDS ':
+            raise ValueError(f'Cannot pack texture with invalid DDS header: "{source_path}"')
+
+        height, width = struct.unpack_from('<II', header, 12)
+        mip_count: int = max(1, struct.unpack_from('<I', header, 28)[0])
+        pixel_format: tuple = struct.unpack_from('<II4sIIIII', header, 76)
+        caps2: int = struct.unpack_from('<I', header, 112)[0]
+
+        data_offset: int = 128
+
+        if pixel_format[2] == b'DX10':
+            if len(header) < 148:
+                raise ValueError(f'Cannot pack texture with invalid DX10 header: "{source_path}"')
+            dxgi_format, _, misc_flags, array_size = struct.unpack_from('<IIII', header, 128)
+            # DDS_RESOURCE_MISC_TEXTURECUBE
+            is_cubemap: bool = bool(misc_flags & 0x4)
+            data_offset = 148
+        else:
+            dxgi_format = self._get_legacy_format(pixel_format)
+            # DDSCAPS2_CUBEMAP
+            is_cubemap = bool(caps2 & 0x200)
+            array_size = 1
+
+        if not dxgi_format:
+            raise ValueError(f'Cannot pack texture with unsupported pixel format: "{source_path}"')
+
+        data_size: int = file_size - data_offset
+
+        mip_sizes: List[int] = [self._get_mip_size(max(1, width >> mip), max(1, height >> mip), dxgi_format)
+                                for mip in range(mip_count)]
+
+        # cubemaps and arrays interleave mip levels by face, so they are stored whole
+        if is_cubemap or array_size > 1 or sum(mip_sizes) != data_size:
+            chunks: Tuple[Ba2Chunk, ...] = (Ba2Chunk(data_offset, data_size, 0, mip_count - 1),)
+        else:
+            chunk_list: List[Ba2Chunk] = []
+            offset: int = data_offset
+
+            for mip, mip_size in enumerate(mip_sizes):
+                if max(width >> mip, height >> mip) <= self.chunk_mip_size:
+                    chunk_list.append(Ba2Chunk(offset, data_offset + data_size - offset, mip, mip_count - 1))
+                    break
+
+                chunk_list.append(Ba2Chunk(offset, mip_size, mip, mip))
+                offset += mip_size
+
+            chunks = tuple(chunk_list)
+
+        return Ba2File(source_path, archive_path, name_hash, extension, folder_hash,
+                       height, width, mip_count, dxgi_format, is_cubemap, chunks)
+
+    def _read_chunk(self, source_path: str, offset: int, size: int) -> Tuple[bytes, int, int]:
+        """Returns chunk as stored in archive, its packed size, which is 0 if chunk is not compressed, and its unpacked size"""
+        with open(source_path, mode='rb') as f:
+            f.seek(offset)
+            data: bytes = f.read() if size < 0 else f.read(size)
+
+        if not self.compress:
+            return data, 0, len(data)
+
+        compressed_data: bytes = zlib.compress(data)
+
+        # store chunks that do not compress as they are
+        if len(compressed_data) >= len(data):
+            return data, 0, len(data)
+
+        return compressed_data, len(compressed_data), len(data)
+
+    def write(self, output_path: str, files: List[Tuple[str, str]]) -> int:
+        """
+        Writes archive from source paths and archive-relative paths, and returns number of files written
+
+        Archives containing only DDS files are written as texture archives. Files with the same
+        archive path are written once.
+        """
+        archive_type: bytes = self.DX10 if self.is_texture_archive(files) else self.GNRL
+
+        records: List[Ba2File] = []
+        archive_paths: set = set()
+
+        for source_path, archive_path in files:
+            archive_path = archive_path.replace('/', '\\').strip('\\')
+
+            key: str = archive_path.lower()
+            if key in archive_paths:
+                continue
+            archive_paths.add(key)
+
+            folder_name, _, file_name = key.rpartition('\\')
+            root, extension = os.path.splitext(file_name)
+
+            record = Ba2File(source_path, archive_path, self.get_hash(root),
+                             extension[1:].encode('cp1252')[:4].ljust(4, b'\x00'), self.get_hash(folder_name))
+            records.append(record)
+
+        if archive_type == self.DX10:
+            with ThreadPoolExecutor(max_workers=self.worker_limit) as executor:
+                records = list(executor.map(lambda r: self._read_texture(*r[:5]), records))
+
+            data_offset: int = self.header_size + sum(self.texture_record_size + self.chunk_record_size * len(record.chunks)
+                                                      for record in records)
+        else:
+            data_offset = self.header_size + self.general_record_size * len(records)
+
+        temp_path = f'{output_path}.tmp'
+
+        # the archive is replaced only when it is complete, so failures do not leave partial files
+        try:
+            with open(temp_path, mode='wb') as f:
+                f.seek(data_offset)
+
+                chunk_records: List[Tuple[int, int, int]] = []
+                self._write_chunks(f, records, data_offset, chunk_records)
+
+                name_table_offset: int = f.tell()
+
+                for record in records:
+                    encoded_path: bytes = record.archive_path.encode('cp1252')
+                    f.write(struct.pack('<H', len(encoded_path)) + encoded_path)
+
+                f.seek(0)
+
+                f.write(struct.pack('<4sI4sIQ', b'BTDX', self.version, archive_type, len(records), name_table_offset))
+
+                chunk_iter = iter(chunk_records)
+
+                for record in records:
+                    if archive_type == self.GNRL:
+                        offset, packed_size, unpacked_size = next(chunk_iter)
+                        f.write(struct.pack('<I4sIIQIII', record.name_hash, record.extension, record.folder_hash,
+                                            self.general_record_flags, offset, packed_size, unpacked_size,
+                                            self.record_sentinel))
+                        continue
+
+                    f.write(struct.pack('<I4sIBBHHHBBH', record.name_hash, record.extension, record.folder_hash,
+                                        0, len(record.chunks), self.chunk_record_size, record.height, record.width,
+                                        record.mip_count, record.dxgi_format, 0x801 if record.is_cubemap else 0x800))
+
+                    for chunk in record.chunks:
+                        offset, packed_size, unpacked_size = next(chunk_iter)
+                        f.write(struct.pack('<QIIHHI', offset, packed_size, unpacked_size,
+                                            chunk.start_mip, chunk.end_mip, self.record_sentinel))
+
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+
+        return len(records)
+
+    def _write_chunks(self, f: IO, records: List[Ba2File], data_offset: int, chunk_records: list) -> None:
+        """Writes chunks in archive order while later chunks are compressed, and records their offsets and sizes"""
+        items: List[Tuple[str, int, int]] = []
+        for record in records:
+            if record.chunks:
+                items.extend((record.source_path, chunk.offset, chunk.size) for chunk in record.chunks)
+            else:
+                items.append((record.source_path, 0, -1))
+
+        offset: int = data_offset
+
+        with ThreadPoolExecutor(max_workers=self.worker_limit) as executor:
+            pending: Deque = deque()
+            next_items = iter(items)
+
+            def submit_next() -> None:
+                item = next(next_items, None)
+                if item is not None:
+                    pending.append(executor.submit(self._read_chunk, *item))
+
+            for _ in range(self.worker_limit * self.pending_chunks_per_worker):
+                submit_next()
+
+            while pending:
+                data, packed_size, unpacked_size = pending.popleft().result()
+                submit_next()
+
+                f.write(data)
+                chunk_records.append((offset, packed_size, unpacked_size))
+                offset += len(data)
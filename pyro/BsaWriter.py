@@ -0,0 +1,237 @@
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Deque, Dict, List, Tuple
+
+import lz4.frame
+
+
+class BsaWriter:
+    """
+    Writes Skyrim (v104) and Skyrim Special Edition (v105) archives from files at their source paths
+
+    File bodies are compressed on a thread pool and written in archive order. Records do not
+    depend on file sizes, so the offset of the first file is known before any file is read.
+    """
+    TES5: int = 104
+    SSE: int = 105
+
+    # include directory names, include file names, compressed archive
+    flag_directory_names: int = 0x1
+    flag_file_names: int = 0x2
+    flag_compressed: int = 0x4
+
+    # file size bit that inverts the compression of the archive for one file
+    compression_toggle: int = 0x40000000
+
+    # content types in header, by extension
+    file_flags: Dict[str, int] = {
+        '.nif': 0x1,
+        '.dds': 0x2,
+        '.xml': 0x4,
+        '.swf': 0x4,
+        '.wav': 0x8,
+        '.xwm': 0x8,
+        '.fuz': 0x10,
+        '.lip': 0x10,
+        '.fxp': 0x20,
+        '.spt': 0x40,
+        '.tex': 0x80,
+        '.fnt': 0x80,
+    }
+    misc_file_flag: int = 0x100
+
+    # the game cannot play compressed sounds
+    uncompressed_extensions: tuple = ('.wav', '.xwm', '.fuz')
+
+    # limits how far compression can run ahead of writing, in files per worker
+    pending_files_per_worker: int = 4
+
+    def __init__(self, version: int, *, compress: bool = True, worker_limit: int = 0) -> None:
+        if version not in (BsaWriter.TES5, BsaWriter.SSE):
+            raise ValueError(f'Cannot write archive with unsupported version: {version}')
+
+        self.version: int = version
+        self.compress: bool = compress
+        self.worker_limit: int = worker_limit or os.cpu_count() or 1
+
+    @staticmethod
+    def get_hash(name: str, is_folder: bool = False) -> int:
+        """Returns hash of lowercase, backslash-separated folder path or file name"""
+        if is_folder:
+            root, extension = name, ''
+        else:
+            root, extension = os.path.splitext(name)
+
+        chars: bytes = root.encode('cp1252')
+        extension_chars: bytes = extension.encode('cp1252')
+        length: int = len(chars)
+
+        hash1: int = 0
+        if length > 0:
+            hash1 = chars[-1] | ((chars[-2] if length > 2 else 0) << 8) | (length << 16) | (chars[0] << 24)
+
+        if extension == '.kf':
+            hash1 |= 0x80
+        elif extension == '.nif':
+            hash1 |= 0x8000
+        elif extension == '.dds':
+            hash1 |= 0x8080
+        elif extension == '.wav':
+            hash1 |= 0x80000000
+
+        hash2: int = 0
+        for char in chars[1:-2]:
+            hash2 = (hash2 * 0x1003F + char) & 0xFFFFFFFF
+
+        hash3: int = 0
+        for char in extension_chars:
+            hash3 = (hash3 * 0x1003F + char) & 0xFFFFFFFF
+
+        hash2 = (hash2 + hash3) & 0xFFFFFFFF
+
+        return (hash2 << 32) | hash1
+
+    @staticmethod
+    def _normalize_archive_path(archive_path: str) -> str:
+        return archive_path.replace('/', '\\').strip('\\').lower()
+
+    def _read_file(self, source_path: str, file_name: str) -> Tuple[bytes, bool]:
+        """Returns file body as stored in archive, and whether its compression differs from the archive"""
+        with open(source_path, mode='rb') as f:
+            data: bytes = f.read()
+
+        if not self.compress or file_name.endswith(self.uncompressed_extensions):
+            return data, self.compress
+
+        if self.version == BsaWriter.SSE:
+            compressed_data: bytes = lz4.frame.compress(data)
+        else:
+            compressed_data = zlib.compress(data)
+
+        # store files that do not compress, such as already compressed textures, as they are
+        if len(compressed_data) + 4 >= len(data):
+            return data, True
+
+        # compressed bodies are prefixed with their original size
+        return struct.pack('<I', len(data)) + compressed_data, False
+
+    def write(self, output_path: str, files: List[Tuple[str, str]]) -> int:
+        """
+        Writes archive from source paths and archive-relative paths, and returns number of files written
+
+        Files with the same archive path are written once.
+        """
+        folders: Dict[str, Dict[str, str]] = {}
+
+        for source_path, archive_path in files:
+            folder_name, _, file_name = self._normalize_archive_path(archive_path).rpartition('\\')
+            # files in the archive root are stored in a folder with an empty name
+            folders.setdefault(folder_name, {}).setdefault(file_name, source_path)
+
+        sorted_folders: List[Tuple[int, str, List[Tuple[int, str, str]]]] = sorted(
+            (self.get_hash(folder_name, True), folder_name,
+             sorted((self.get_hash(file_name), file_name, source_path) for file_name, source_path in folder_files.items()))
+            for folder_name, folder_files in folders.items())
+
+        file_count: int = sum(len(folder_files) for _, _, folder_files in sorted_folders)
+        folder_names_length: int = sum(len(folder_name) + 1 for folder_name in folders)
+        file_names_length: int = sum(len(file_name) + 1 for _, _, folder_files in sorted_folders for _, file_name, _ in folder_files)
+
+        archive_flags: int = self.flag_directory_names | self.flag_file_names
+        if self.compress:
+            archive_flags |= self.flag_compressed
+
+        file_flags: int = 0
+        for _, _, folder_files in sorted_folders:
+            for _, file_name, _ in folder_files:
+                file_flags |= self.file_flags.get(os.path.splitext(file_name)[1], self.misc_file_flag)
+
+        header_size: int = 36
+        folder_record_size: int = 24 if self.version == BsaWriter.SSE else 16
+
+        # file record blocks follow folder records, and each starts with the folder name
+        block_offsets: List[int] = []
+        offset: int = header_size + folder_record_size * len(sorted_folders)
+        for _, folder_name, folder_files in sorted_folders:
+            block_offsets.append(offset)
+            offset += 1 + len(folder_name) + 1 + 16 * len(folder_files)
+
+        data_offset: int = offset + file_names_length
+
+        temp_path = f'{output_path}.tmp'
+
+        # the archive is replaced only when it is complete, so failures do not leave partial files
+        try:
+            with open(temp_path, mode='wb') as f:
+                f.seek(data_offset)
+
+                file_records: List[Tuple[int, int, int]] = []
+                self._write_file_data(f, sorted_folders, data_offset, file_records)
+
+                f.seek(0)
+
+                f.write(struct.pack('<4sIIIIIIII', b'BSA\x00', self.version, header_size, archive_flags, len(sorted_folders),
+                                    file_count, folder_names_length, file_names_length, file_flags))
+
+                for (folder_hash, _, folder_files), block_offset in zip(sorted_folders, block_offsets):
+                    # folder offsets include the length of the file name block, as the games expect
+                    folder_offset: int = block_offset + file_names_length
+                    if self.version == BsaWriter.SSE:
+                        f.write(struct.pack('<QIIQ', folder_hash, len(folder_files), 0, folder_offset))
+                    else:
+                        f.write(struct.pack('<QII', folder_hash, len(folder_files), folder_offset))
+
+                records = iter(file_records)
+
+                for _, folder_name, folder_files in sorted_folders:
+                    encoded_folder_name: bytes = folder_name.encode('cp1252')
+                    f.write(struct.pack('<B', len(encoded_folder_name) + 1) + encoded_folder_name + b'\x00')
+
+                    for file_hash, _, _ in folder_files:
+                        size, file_offset, toggle = next(records)
+                        f.write(struct.pack('<QII', file_hash, size | toggle, file_offset))
+
+                for _, _, folder_files in sorted_folders:
+                    for _, file_name, _ in folder_files:
+                        f.write(file_name.encode('cp1252') + b'\x00')
+
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+
+        return file_count
+
+    def _write_file_data(self, f: IO, sorted_folders: list, data_offset: int, file_records: list) -> None:
+        """Writes file bodies in archive order while later files are compressed, and records their sizes and offsets"""
+        items: List[Tuple[str, str]] = [(source_path, file_name)
+                                        for _, _, folder_files in sorted_folders
+                                        for _, file_name, source_path in folder_files]
+
+        offset: int = data_offset
+
+        with ThreadPoolExecutor(max_workers=self.worker_limit) as executor:
+            pending: Deque = deque()
+            next_items = iter(items)
+
+            def submit_next() -> None:
+                item = next(next_items, None)
+                if item is not None:
+                    pending.append(executor.submit(self._read_file, *item))
+
+            for _ in range(self.worker_limit * self.pending_files_per_worker):
+                submit_next()
+
+            while pending:
+                data, toggle = pending.popleft().result()
+                submit_next()
+
+                if offset + len(data) > 0xFFFFFFFF:
+                    raise ValueError('Cannot write archive larger than 4 GB')
+
+                f.write(data)
+                file_records.append((len(data), offset, self.compression_toggle if toggle else 0))
+                offset += len(data)
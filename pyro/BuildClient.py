@@ -0,0 +1,77 @@
+import getpass
+import os
+import sys
+import tempfile
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection
+from typing import Optional
+
+
+class BuildClient:
+    """
+    Forwards command line builds to a running build server
+
+    This module is imported before any build modules, so it must stay lightweight.
+    """
+    @staticmethod
+    def get_address() -> str:
+        """Returns address of build server for current user"""
+        if sys.platform == 'win32':
+            return rf'\\.\pipe\pyro-{getpass.getuser()}'
+        return os.path.join(tempfile.gettempdir(), f'pyro-{os.getuid()}.sock')
+
+    @staticmethod
+    def get_authkey_path() -> str:
+        return os.path.join(os.path.expanduser('~'), '.pyro', 'daemon.key')
+
+    @staticmethod
+    def read_authkey() -> bytes:
+        try:
+            with open(BuildClient.get_authkey_path(), mode='rb') as f:
+                return f.read()
+        except OSError:
+            return b''
+
+    @staticmethod
+    def connect() -> Optional[Connection]:
+        """Returns connection to build server, or None if no server is running"""
+        authkey: bytes = BuildClient.read_authkey()
+
+        if not authkey:
+            return None
+
+        address: str = BuildClient.get_address()
+
+        if sys.platform != 'win32' and not os.path.exists(address):
+            return None
+
+        # a stale key, left by a build server that was restarted, fails authentication
+        try:
+            return Client(address, authkey=authkey)
+        except (OSError, EOFError, AuthenticationError):
+            return None
+
+    @staticmethod
+    def try_forward(argv: list, cwd: str) -> Optional[int]:
+        """Sends build to build server and prints its output, returning exit code, or None if no server is running"""
+        connection = BuildClient.connect()
+
+        if connection is None:
+            return None
+
+        with connection:
+            try:
+                connection.send({'argv': argv, 'cwd': cwd, 'env': dict(os.environ)})
+
+                while True:
+                    message: dict = connection.recv()
+
+                    if 'log' in message:
+                        print(message['log'], flush=True)
+                    elif 'exit' in message:
+                        return message['exit']
+            except KeyboardInterrupt:
+                return 1
+            except (OSError, EOFError, AuthenticationError):
+                print('Lost connection to build server', file=sys.stderr)
+                return 1
@@ -1,26 +1,31 @@
+import asyncio
+import heapq
 import logging
-import multiprocessing
+import math
 import os
 import re
+import shutil
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 
-import psutil
-
 from pyro.Anonymizer import Anonymizer
+from pyro.ArtifactCache import ArtifactCache
+from pyro.BuildStats import BuildStats
 from pyro.Enums.BuildEvent import BuildEvent
 from pyro.Comparators import is_command_node
+from pyro.CompileJob import CompileJob
+from pyro.Enums.GameType import GameType
 from pyro.PackageManager import PackageManager
 from pyro.PapyrusProject import PapyrusProject
+from pyro.Normalizer import Normalizer
 from pyro.PathHelper import PathHelper
-from pyro.PexReader import PexReader
 from pyro.ProcessManager import ProcessManager
+from pyro.RemoteCaches import RemoteCacheBase
 from pyro.Enums.ProcessState import ProcessState
 from pyro.TimeElapsed import TimeElapsed
 
-from pyro.Comparators import endswith
-
 
 class BuildFacade:
     log: logging.Logger = logging.getLogger('pyro')
@@ -29,8 +34,20 @@ class BuildFacade:
 
     time_elapsed: TimeElapsed = TimeElapsed()
 
+    artifact_cache: ArtifactCache = None
+    build_stats: BuildStats = None
+    remote_cache: RemoteCacheBase = None
+    remote_worker_limit: int = 8
+
+    batch_path: str = ''
+    batch_size_min: int = 8
+
+    compiled_paths: list = []
+    uploaded_keys: dict = {}
+
     scripts_count: int = 0
     success_count: int = 0
+    restored_count: int = 0
     command_count: int = 0
 
     @property
@@ -51,13 +68,17 @@ class BuildFacade:
     def __init__(self, ppj: PapyrusProject) -> None:
         self.ppj = ppj
 
-        self.scripts_count = len(self.ppj.psc_paths)
+        self.compiled_paths = []
+        self.uploaded_keys = {}
+
+        self.scripts_count = len(self.ppj.script_index)
 
         # WARN: if methods are renamed and their respective option names are not, this will break.
         options: dict = deepcopy(self.ppj.options.__dict__)
 
         for key in options:
-            if key in ('args', 'input_path', 'anonymize', 'package', 'zip', 'zip_compression'):
+            if key in ('args', 'input_path', 'anonymize', 'deterministic_anonymize', 'reproducible', 'package', 'zip',
+                       'zip_compression', 'watch', 'use_bsarch'):
                 continue
             if key.startswith(('ignore_', 'no_', 'force_', 'resolve_')):
                 continue
@@ -65,40 +86,13 @@ class BuildFacade:
                 continue
             setattr(self.ppj.options, key, getattr(self.ppj, f'get_{key}')())
 
-    def _find_modified_scripts(self) -> list:
-        pex_paths: list = []
-
-        for object_name, script_path in self.ppj.psc_paths.items():
-            script_name, _ = os.path.splitext(os.path.basename(script_path))
-
-            # if pex exists, compare time_t in pex header with psc's last modified timestamp
-            pex_match: list = [pex_path for pex_path in self.ppj.pex_paths if endswith(pex_path, f'{script_name}.pex', ignorecase=True)]
-            if not pex_match:
-                continue
-
-            pex_path: str = pex_match[0]
-            if not os.path.isfile(pex_path):
-                continue
-
-            try:
-                header = PexReader.get_header(pex_path)
-            except ValueError:
-                BuildFacade.log.warning(f'Cannot determine compilation time due to unknown magic: "{pex_path}"')
-                continue
-
-            psc_last_modified: float = os.path.getmtime(script_path)
-            pex_last_compiled: float = float(header.compilation_time.value)
-
-            # if psc is older than the pex
-            if psc_last_modified < pex_last_compiled:
-                pex_paths.append(pex_path)
+        self.batch_path = os.path.join(self.ppj.options.temp_path, 'batches')
 
-        return PathHelper.uniqify(pex_paths)
+        if not self.ppj.options.no_cache:
+            self.artifact_cache = ArtifactCache(self.ppj.options.cache_path, self.ppj.options.cache_size * 1024 * 1024)
 
-    @staticmethod
-    def _limit_priority() -> None:
-        process = psutil.Process(os.getpid())
-        process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS if sys.platform == 'win32' else 19)
+        if self.ppj.options.remote_cache:
+            self.remote_cache = RemoteCacheBase.create(self.ppj.options.remote_cache, self.ppj.options.remote_cache_token)
 
     def try_build_event(self, event: BuildEvent) -> None:
         if event == BuildEvent.PRE:
@@ -118,52 +112,346 @@ class BuildFacade:
 
             ProcessManager.run_command(command, self.ppj.project_path, environ)
 
+    def _record_result(self, script_path: str, state: ProcessState) -> None:
+        """Counts compiler result and records compiled script in build manifest"""
+        entry: dict = self.ppj.compile_keys[script_path]
+
+        if state == ProcessState.SUCCESS:
+            self.success_count += 1
+            if self.ppj.options.reproducible:
+                self._normalize_script(entry)
+            self.compiled_paths.append(entry['pex'])
+            self.ppj.build_manifest.update(script_path, entry)
+            if self.artifact_cache is not None:
+                self.artifact_cache.put(entry['key'], entry['pex'])
+            if self.remote_cache is not None and not self.ppj.options.no_remote_cache_upload:
+                self.uploaded_keys[entry['key']] = entry['pex']
+        else:
+            self.ppj.build_manifest.discard(script_path)
+
+    def _normalize_script(self, entry: dict) -> None:
+        """Rewrites compile-time metadata in compiled script, before the script is cached"""
+        script_name: str = os.path.splitext(os.path.relpath(entry['pex'], self.ppj.options.output_path))[0]
+        Normalizer.normalize_script(entry['pex'], f'{script_name}.psc', entry['key'])
+
+    def _restore_artifact(self, entry: dict) -> bool:
+        """Restores compiled script from local cache or, failing that, from remote cache"""
+        if self.artifact_cache is not None and self.artifact_cache.get(entry['key'], entry['pex']):
+            return True
+
+        if self.remote_cache is not None and self.remote_cache.fetch(entry['key'], entry['pex']):
+            if self.artifact_cache is not None:
+                self.artifact_cache.put(entry['key'], entry['pex'])
+            return True
+
+        return False
+
+    def _restore_artifacts(self, commands: dict) -> None:
+        """Restores compiled scripts from caches and removes their commands"""
+        script_paths: list = list(commands)
+
+        # remote fetches are network-bound, so they are overlapped
+        with ThreadPoolExecutor(max_workers=self.remote_worker_limit) as executor:
+            restored: list = list(executor.map(lambda script_path: self._restore_artifact(self.ppj.compile_keys[script_path]),
+                                               script_paths))
+
+        for script_path, is_restored in zip(script_paths, restored):
+            if not is_restored:
+                continue
+
+            entry: dict = self.ppj.compile_keys[script_path]
+
+            del commands[script_path]
+            self.restored_count += 1
+
+            # artifacts cached by builds that did not normalize scripts
+            if self.ppj.options.reproducible:
+                self._normalize_script(entry)
+
+            self.compiled_paths.append(entry['pex'])
+            self.ppj.build_manifest.update(script_path, entry)
+
+        if self.restored_count > 0:
+            BuildFacade.log.info(f'Restored {self.restored_count} compiled scripts from cache.')
+
+    def _upload_artifacts(self) -> None:
+        """Stores scripts compiled in this build in remote cache"""
+        if not self.uploaded_keys or not self.remote_cache.available:
+            return
+
+        BuildFacade.log.info(f'Uploading {len(self.uploaded_keys)} compiled scripts to remote cache...')
+
+        with ThreadPoolExecutor(max_workers=self.remote_worker_limit) as executor:
+            for key, pex_path in self.uploaded_keys.items():
+                executor.submit(self.remote_cache.store, key, pex_path)
+
+    @staticmethod
+    async def _run_job(job: CompileJob) -> dict:
+        """Runs compiler for job and returns the resulting state of each script in the job"""
+        state, diagnostics = await ProcessManager.run_compiler(job.arguments)
+
+        if not job.is_batch or state in (ProcessState.FAILURE, ProcessState.INTERRUPTED):
+            return {script_path: state for script_path in job.script_paths}
+
+        failed_names: set = {diagnostic.script_name for diagnostic in diagnostics}
+
+        return {script_path: ProcessState.ERRORS if script_name in failed_names else ProcessState.SUCCESS
+                for script_name, script_path in job.script_names.items()}
+
+    @staticmethod
+    def _partition(members: list, batch_count: int, estimates: dict) -> list:
+        """Distributes (script path, relative path) pairs into batches of similar estimated duration"""
+        batches: list = [[] for _ in range(batch_count)]
+        loads: list = [(0.0, i) for i in range(batch_count)]
+
+        # longest processing time first: each script goes to the least loaded batch
+        for member in sorted(members, key=lambda m: estimates[m[0]], reverse=True):
+            load, i = heapq.heappop(loads)
+            batches[i].append(member)
+            heapq.heappush(loads, (load + estimates[member[0]], i))
+
+        return [batch for batch in batches if batch]
+
+    def _create_jobs(self, commands: dict, waves: list, worker_limit: int) -> list:
+        """
+        Returns compiler jobs in dependency order
+
+        When enough scripts need compiling, the scripts in each wave are staged into
+        per-worker batch folders, so that each compiler process compiles many scripts.
+        """
+        default_estimate: float = self.build_stats.get_default()
+        estimates: dict = {script_path: self.build_stats.get(script_path, default_estimate) for script_path in commands}
+
+        if self.command_count < worker_limit * self.batch_size_min:
+            return [CompileJob(arguments=commands[script_path], script_paths=[script_path],
+                               estimates={script_path: estimates[script_path]})
+                    for wave in waves for script_path in wave]
+
+        # clear batches left behind by an interrupted build
+        shutil.rmtree(self.batch_path, ignore_errors=True)
+
+        jobs: list = []
+
+        for wave in waves:
+            # batches are folders, so namespaced scripts are grouped by namespace
+            groups: dict = {}
+            for script_path in wave:
+                if self.ppj.options.game_type == GameType.FO4:
+                    relative_path: str = self.ppj.script_index.get_by_psc(script_path).object_name
+                else:
+                    relative_path = os.path.basename(script_path)
+                groups.setdefault(os.path.dirname(relative_path), []).append((script_path, relative_path))
+
+            batch_size: int = max(self.batch_size_min, math.ceil(len(wave) / worker_limit))
+
+            for folder_path, members in groups.items():
+                for batch in self._partition(members, math.ceil(len(members) / batch_size), estimates):
+                    if len(batch) == 1:
+                        script_path, _ = batch[0]
+                        jobs.append(CompileJob(arguments=commands[script_path], script_paths=[script_path],
+                                               estimates={script_path: estimates[script_path]}))
+                        continue
+
+                    staging_path: str = os.path.join(self.batch_path, str(len(jobs)))
+
+                    job = CompileJob()
+
+                    import_paths: list = [staging_path]
+                    for script_path, relative_path in batch:
+                        PathHelper.link_or_copy(script_path, os.path.join(staging_path, relative_path))
+
+                        script_name, _ = os.path.splitext(os.path.basename(relative_path))
+                        job.script_names[script_name.casefold()] = script_path
+                        job.script_paths.append(script_path)
+                        job.estimates[script_path] = estimates[script_path]
+
+                        import_paths.extend(self.ppj.compile_import_paths[script_path])
+
+                    job.arguments = self.ppj.build_batch_command(os.path.join(staging_path, folder_path),
+                                                               PathHelper.uniqify(import_paths))
+                    jobs.append(job)
+
+        return jobs
+
+    @staticmethod
+    def _get_priorities(jobs: list, job_dependents: list) -> list:
+        """
+        Returns, for each job, the estimated duration of the longest chain of jobs that starts with it
+
+        Jobs on the critical path are started first, and independent jobs are started
+        longest first, so that long jobs overlap with short jobs instead of trailing them.
+        """
+        priorities: list = [0.0] * len(jobs)
+
+        # jobs are in dependency order, so dependents are visited before the jobs they depend on
+        for i in reversed(range(len(jobs))):
+            priorities[i] = jobs[i].estimate + max((priorities[j] for j in job_dependents[i]), default=0.0)
+
+        return priorities
+
+    def _record_durations(self, job: CompileJob, states: dict, duration: float) -> None:
+        """Records duration of job for each successfully compiled script, shared in proportion to estimates"""
+        estimate: float = job.estimate
+
+        for script_path, state in states.items():
+            if state != ProcessState.SUCCESS:
+                continue
+            if estimate > 0:
+                share: float = job.estimates[script_path] / estimate
+            else:
+                share = 1 / len(job.script_paths)
+            self.build_stats.record(script_path, duration * share)
+
+    async def _run_indexed_job(self, index: int, job: CompileJob) -> int:
+        start_time: float = time.perf_counter()
+
+        try:
+            states: dict = await BuildFacade._run_job(job)
+        except OSError as e:
+            BuildFacade.log.error(f'Cannot run compiler because: {e.strerror}')
+            states = {script_path: ProcessState.FAILURE for script_path in job.script_paths}
+
+        self._record_durations(job, states, time.perf_counter() - start_time)
+
+        for script_path, state in states.items():
+            self._record_result(script_path, state)
+
+        return index
+
+    async def _compile_jobs(self, jobs: list, job_blockers: list, worker_limit: int) -> None:
+        """Starts the highest priority ready job whenever a worker is free"""
+        job_dependents: list = [[] for _ in jobs]
+        for i, blocking_jobs in enumerate(job_blockers):
+            for j in blocking_jobs:
+                job_dependents[j].append(i)
+
+        priorities: list = self._get_priorities(jobs, job_dependents)
+
+        remaining: list = [set(blocking_jobs) for blocking_jobs in job_blockers]
+        ready: list = [(-priorities[i], i) for i in range(len(jobs)) if not remaining[i]]
+        heapq.heapify(ready)
+
+        running: set = set()
+
+        while ready or running:
+            while ready and len(running) < worker_limit:
+                _, i = heapq.heappop(ready)
+                running.add(asyncio.ensure_future(self._run_indexed_job(i, jobs[i])))
+
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+
+            # dependents are released even on failure so the compiler can report their errors, too
+            for task in done:
+                i = task.result()
+                for j in job_dependents[i]:
+                    remaining[j].discard(i)
+                    if not remaining[j]:
+                        heapq.heappush(ready, (-priorities[j], j))
+
     def try_compile(self) -> None:
         """Builds and passes commands to Papyrus Compiler"""
-        commands: list = self.ppj.build_commands()
+        commands: dict = self.ppj.build_commands()
+
+        # compiled scripts will be written to folders that may have been indexed during discovery
+        self.ppj.file_index.clear()
+
+        if self.artifact_cache is not None or self.remote_cache is not None:
+            self._restore_artifacts(commands)
 
         self.command_count = len(commands)
 
-        self.time_elapsed.start_time = time.time()
+        if self.command_count == 0:
+            self.ppj.build_manifest.save()
+            return
 
-        if self.ppj.options.no_parallel or self.command_count == 1:
-            for command in commands:
-                if ProcessManager.run_compiler(command) == ProcessState.SUCCESS:
-                    self.success_count += 1
-        elif self.command_count > 0:
-            multiprocessing.freeze_support()
+        self.build_stats = BuildStats(self.ppj.get_stats_path())
+
+        blockers: dict = self.ppj.dependency_graph.get_blockers(commands.keys())
+        waves: list = self.ppj.dependency_graph.get_waves(blockers)
+
+        if self.ppj.options.no_parallel:
+            worker_limit: int = 1
+        else:
             worker_limit = min(self.command_count, self.ppj.options.worker_limit)
-            pool = multiprocessing.Pool(processes=worker_limit,
-                                        initializer=BuildFacade._limit_priority)
-            for state in pool.imap(ProcessManager.run_compiler, commands):
-                if state == ProcessState.SUCCESS:
-                    self.success_count += 1
-            pool.close()
-            pool.join()
+
+        jobs: list = self._create_jobs(commands, waves, worker_limit)
+
+        batch_count: int = sum(1 for job in jobs if job.is_batch)
+        if batch_count > 0:
+            BuildFacade.log.info(f'Compiling {self.command_count} scripts in {len(waves)} dependency waves '
+                                 f'({batch_count} batches, {len(jobs) - batch_count} single scripts)...')
+        else:
+            BuildFacade.log.info(f'Compiling {self.command_count} scripts in {len(waves)} dependency waves...')
+
+        job_of: dict = {script_path: i for i, job in enumerate(jobs) for script_path in job.script_paths}
+        job_blockers: list = [{job_of[blocking_path]
+                               for script_path in job.script_paths
+                               for blocking_path in blockers[script_path]} - {i}
+                              for i, job in enumerate(jobs)]
+
+        self.time_elapsed.start_time = time.time()
+
+        try:
+            asyncio.run(self._compile_jobs(jobs, job_blockers, worker_limit))
+        except KeyboardInterrupt:
+            # asyncio.run cancels running jobs, which terminates their compiler processes
+            BuildFacade.log.error('Compilation interrupted by user.')
+            self.ppj.build_manifest.save()
+            self.build_stats.save()
+            sys.exit(1)
+        finally:
+            shutil.rmtree(self.batch_path, ignore_errors=True)
 
         self.time_elapsed.end_time = time.time()
 
+        self.ppj.build_manifest.save()
+        self.build_stats.save()
+
+        if self.remote_cache is not None:
+            self._upload_artifacts()
+
+        if self.artifact_cache is not None:
+            self.artifact_cache.evict()
+
     def try_anonymize(self) -> None:
         """Obfuscates identifying metadata in compiled scripts"""
-        scripts: list = self._find_modified_scripts()
+        # scripts compiled by earlier builds were anonymized by those builds
+        if not self.compiled_paths:
+            BuildFacade.log.info('No compiled scripts to anonymize because no source scripts were modified')
+            return
 
-        if not scripts and not self.ppj.missing_scripts and not self.ppj.options.no_incremental_build:
-            BuildFacade.log.error('Cannot anonymize compiled scripts because no source scripts were modified')
-        else:
-            # these are absolute paths. there's no reason to manipulate them.
-            for pex_path in self.ppj.pex_paths:
-                if not os.path.isfile(pex_path):
-                    BuildFacade.log.warning(f'Cannot locate file to anonymize: "{pex_path}"')
-                    continue
+        seeds: dict = {}
+        if self.ppj.options.deterministic_anonymize:
+            # compile keys hash the inputs of each script, so the same inputs produce the same names on every machine
+            seeds = {entry['pex']: entry['key'].encode('ascii') for entry in self.ppj.compile_keys.values()}
 
-                Anonymizer.anonymize_script(pex_path)
+        with ThreadPoolExecutor() as executor:
+            results: list = list(executor.map(lambda pex_path: Anonymizer.anonymize_script(pex_path, seeds.get(pex_path, b'')),
+                                              self.compiled_paths))
 
-    def try_pack(self) -> None:
-        """Generates BSA/BA2 packages for project"""
-        package_manager = PackageManager(self.ppj)
-        package_manager.create_packages()
+        BuildFacade.log.info(f'Anonymized {sum(results)} of {len(results)} compiled scripts.')
+
+        self.discard_compiled([pex_path for pex_path, result in zip(self.compiled_paths, results) if not result])
+
+    def discard_compiled(self, pex_paths: list) -> None:
+        """
+        Removes compiled scripts from build manifest, so that the next build compiles them again
+
+        Used when scripts compiled for an anonymized build could not be anonymized, since the
+        build manifest would otherwise treat them as current.
+        """
+        if not pex_paths:
+            return
+
+        pex_paths = set(pex_paths)
+
+        for script_path, entry in self.ppj.compile_keys.items():
+            if entry['pex'] in pex_paths:
+                self.ppj.build_manifest.discard(script_path)
+
+        self.ppj.build_manifest.save()
 
-    def try_zip(self) -> None:
-        """Generates ZIP file for project"""
+    def try_pack(self, packages: bool, zip_files: bool) -> None:
+        """Generates BSA/BA2 packages and ZIP files for project concurrently"""
         package_manager = PackageManager(self.ppj)
-        package_manager.create_zip()
+        package_manager.create_outputs(packages, zip_files)
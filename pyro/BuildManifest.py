@@ -0,0 +1,102 @@
+import hashlib
+import json
+import logging
+import os
+
+
+class BuildManifest:
+    """
+    Persistent record of the inputs that produced each compiled script
+
+    Scripts are recompiled only when the key computed from their inputs differs
+    from the key recorded after their last successful compilation.
+    """
+    log: logging.Logger = logging.getLogger('pyro')
+
+    version: int = 1
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.entries: dict = {}
+        self._hashes: dict = {}
+
+        self.load()
+
+    @staticmethod
+    def _normalize_path(path: str) -> str:
+        return os.path.normcase(os.path.normpath(path))
+
+    @staticmethod
+    def create_key(**fields: object) -> str:
+        """Returns stable hash of JSON-serializable fields"""
+        data: bytes = json.dumps(fields, sort_keys=True).encode('utf-8')
+        return hashlib.sha1(data).hexdigest()
+
+    def hash_file(self, path: str) -> str:
+        """Returns content hash of file, or empty string if file cannot be read"""
+        if not path:
+            return ''
+
+        normalized_path = self._normalize_path(path)
+
+        if normalized_path in self._hashes:
+            return self._hashes[normalized_path]
+
+        sha1 = hashlib.sha1()
+
+        try:
+            with open(path, mode='rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    sha1.update(chunk)
+        except OSError:
+            file_hash = ''
+        else:
+            file_hash = sha1.hexdigest()
+
+        self._hashes[normalized_path] = file_hash
+
+        return file_hash
+
+    def invalidate(self, paths: list) -> None:
+        """Forgets content hashes of files that may have changed"""
+        for path in paths:
+            self._hashes.pop(self._normalize_path(path), None)
+
+    def load(self) -> None:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data: dict = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            BuildManifest.log.warning(f'Cannot load build manifest, all scripts will be compiled: "{self.path}" ({e})')
+            return
+
+        if data.get('version') == self.version:
+            self.entries = data.get('scripts', {})
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        temp_path = f'{self.path}.tmp'
+
+        try:
+            with open(temp_path, mode='w', encoding='utf-8') as f:
+                json.dump({'version': self.version, 'scripts': self.entries}, f, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            BuildManifest.log.warning(f'Cannot save build manifest: "{self.path}" ({e.strerror})')
+
+    def is_current(self, script_path: str, key: str, pex_path: str) -> bool:
+        """Returns True if script was last compiled with the same key and its pex still exists"""
+        entry = self.entries.get(self._normalize_path(script_path))
+        return entry is not None and entry.get('key') == key and os.path.isfile(pex_path)
+
+    def get(self, script_path: str) -> dict:
+        return self.entries.get(self._normalize_path(script_path), {})
+
+    def update(self, script_path: str, entry: dict) -> None:
+        self.entries[self._normalize_path(script_path)] = entry
+
+    def discard(self, script_path: str) -> None:
+        self.entries.pop(self._normalize_path(script_path), None)
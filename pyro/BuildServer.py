@@ -0,0 +1,129 @@
+import argparse
+import logging
+import os
+import secrets
+import sys
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Connection, Listener
+
+from pyro.Application import Application
+from pyro.BuildClient import BuildClient
+
+
+class ConnectionLogHandler(logging.Handler):
+    """Sends formatted log records to build client"""
+
+    def __init__(self, connection: Connection) -> None:
+        super(ConnectionLogHandler, self).__init__()
+        self.connection = connection
+        self.is_connected: bool = True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if not self.is_connected:
+            return
+        try:
+            self.connection.send({'log': self.format(record)})
+        except (OSError, ValueError):
+            # client went away, but the build continues so that its results are recorded
+            self.is_connected = False
+
+
+class BuildServer:
+    """
+    Long-lived process that runs builds for build clients
+
+    Projects stay loaded between builds, so that builds skip interpreter startup,
+    project parsing, schema validation, and script discovery.
+    """
+    log: logging.Logger = logging.getLogger('pyro')
+
+    def __init__(self, parser: argparse.ArgumentParser) -> None:
+        self.parser = parser
+        self.projects: dict = {}
+
+    @staticmethod
+    def _create_authkey() -> bytes:
+        authkey_path: str = BuildClient.get_authkey_path()
+        os.makedirs(os.path.dirname(authkey_path), exist_ok=True)
+
+        authkey: bytes = secrets.token_bytes(32)
+
+        # only the current user can read the key
+        fd = os.open(authkey_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, mode='wb') as f:
+            f.write(authkey)
+
+        return authkey
+
+    def serve_forever(self) -> int:
+        if BuildClient.connect() is not None:
+            BuildServer.log.error('Cannot start build server because another build server is running')
+            return 1
+
+        address: str = BuildClient.get_address()
+
+        # remove socket left behind by a build server that did not shut down cleanly
+        if sys.platform != 'win32' and os.path.exists(address):
+            os.remove(address)
+
+        listener = Listener(address, authkey=self._create_authkey())
+
+        BuildServer.log.info(f'Build server listening on "{address}"... Press Ctrl+C to stop.')
+
+        try:
+            while True:
+                try:
+                    connection = listener.accept()
+                except AuthenticationError as e:
+                    BuildServer.log.warning(f'Cannot authenticate build client: {e}')
+                    continue
+                except (OSError, EOFError) as e:
+                    BuildServer.log.warning(f'Cannot accept build client: {e}')
+                    continue
+
+                with connection:
+                    self._handle(connection)
+        except KeyboardInterrupt:
+            BuildServer.log.info('Build server stopped.')
+        finally:
+            listener.close()
+
+        return 0
+
+    def _handle(self, connection: Connection) -> None:
+        try:
+            request: dict = connection.recv()
+        except (OSError, EOFError):
+            return
+
+        handler = ConnectionLogHandler(connection)
+        handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname).4s] %(message)s'))
+
+        BuildServer.log.addHandler(handler)
+
+        cwd: str = os.getcwd()
+        environ: dict = dict(os.environ)
+
+        try:
+            os.chdir(request['cwd'])
+            os.environ.clear()
+            os.environ.update(request['env'])
+
+            Application(self.parser, request['argv'], self.projects).run()
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else 1
+        except Exception as e:
+            BuildServer.log.exception(f'Build failed unexpectedly: {e}')
+            exit_code = 1
+        finally:
+            BuildServer.log.removeHandler(handler)
+            os.environ.clear()
+            os.environ.update(environ)
+            os.chdir(cwd)
+
+        if handler.is_connected:
+            try:
+                connection.send({'exit': exit_code})
+            except (OSError, ValueError):
+                pass
@@ -0,0 +1,70 @@
+import json
+import logging
+import os
+
+
+class BuildStats:
+    """
+    Persistent record of how long each script took to compile
+
+    Durations are smoothed across builds so that one slow or fast build
+    does not dominate the estimate used for scheduling.
+    """
+    log: logging.Logger = logging.getLogger('pyro')
+
+    version: int = 1
+    smoothing: float = 0.5
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.durations: dict = {}
+
+        self.load()
+
+    @staticmethod
+    def _normalize_path(path: str) -> str:
+        return os.path.normcase(os.path.normpath(path))
+
+    def load(self) -> None:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data: dict = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            BuildStats.log.warning(f'Cannot load build stats: "{self.path}" ({e})')
+            return
+
+        if data.get('version') == self.version:
+            self.durations = data.get('durations', {})
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        temp_path = f'{self.path}.tmp'
+
+        try:
+            with open(temp_path, mode='w', encoding='utf-8') as f:
+                json.dump({'version': self.version, 'durations': self.durations}, f, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            BuildStats.log.warning(f'Cannot save build stats: "{self.path}" ({e.strerror})')
+
+    def get_default(self) -> float:
+        """Returns estimate for scripts that have never been compiled, which is the mean known duration"""
+        if not self.durations:
+            return 1.0
+        return sum(self.durations.values()) / len(self.durations)
+
+    def get(self, script_path: str, default: float) -> float:
+        return self.durations.get(self._normalize_path(script_path), default)
+
+    def record(self, script_path: str, duration: float) -> None:
+        """Blends duration of latest compilation into estimate for script"""
+        key = self._normalize_path(script_path)
+
+        previous: float = self.durations.get(key)
+        if previous is not None:
+            duration = self.smoothing * duration + (1 - self.smoothing) * previous
+
+        self.durations[key] = round(duration, 4)
@@ -4,14 +4,37 @@ from collections import UserList
 class CaseInsensitiveList(UserList):
     """
     Simple list type for storing and comparing strings case-insensitively
+
+    Strings are stored casefolded and mirrored in a set, so membership tests do not scan the list.
     """
+    def __init__(self, initlist: object = None) -> None:
+        super().__init__()
+        self._keys: set = set()
+        if initlist is not None:
+            self.extend(initlist)
+
     def __contains__(self, item: object) -> bool:
         if isinstance(item, str):
-            return any(item.casefold() == x.casefold() for x in self.data)
+            return item.casefold() in self._keys
         return item in self.data
 
     def append(self, item: object) -> None:
         if isinstance(item, str):
-            self.data.append(item.casefold())
-        else:
-            self.data.append(item)
+            item = item.casefold()
+            self._keys.add(item)
+        self.data.append(item)
+
+    def extend(self, other: object) -> None:
+        for item in other:
+            self.append(item)
+
+    def remove(self, item: object) -> None:
+        if isinstance(item, str):
+            item = item.casefold()
+        self.data.remove(item)
+        if item not in self.data:
+            self._keys.discard(item)
+
+    def clear(self) -> None:
+        self.data.clear()
+        self._keys.clear()
@@ -1,15 +1,23 @@
 class CommandArguments:
     def __init__(self) -> None:
         self._items: list = []
+        self._arguments: list = []
 
     def append(self, value: str, *, key: str = '', enquote_value: bool = False) -> None:
         if enquote_value:
             self._items.append(f'-{key}="{value}"' if key else f'"{value}"')
+            self._arguments.append(f'-{key}={value}' if key else value)
         else:
             self._items.append(value)
+            self._arguments.append(value)
 
     def clear(self) -> None:
         self._items.clear()
+        self._arguments.clear()
 
     def join(self, delimiter: str = ' ') -> str:
         return delimiter.join(self._items)
+
+    def split(self) -> list:
+        """Returns unquoted arguments for creating a process without a shell"""
+        return list(self._arguments)
@@ -0,0 +1,21 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class CompileJob:
+    arguments: list = field(default_factory=list)
+    script_paths: list = field(default_factory=list)
+
+    # batch jobs only: casefolded script names as reported by the compiler, mapped to script paths
+    script_names: dict = field(default_factory=dict)
+
+    # estimated compile durations from previous builds, in seconds, mapped to script paths
+    estimates: dict = field(default_factory=dict)
+
+    @property
+    def estimate(self) -> float:
+        return sum(self.estimates.values())
+
+    @property
+    def is_batch(self) -> bool:
+        return len(self.script_paths) > 1
@@ -0,0 +1,22 @@
+import os
+from dataclasses import dataclass, field
+
+
+@dataclass
+class CompilerDiagnostic:
+    path: str = field(default_factory=str)
+    line: int = 0
+    column: int = 0
+    message: str = field(default_factory=str)
+
+    @property
+    def script_name(self) -> str:
+        """Returns casefolded name of script without extension"""
+        script_name, _ = os.path.splitext(os.path.basename(self.path))
+        return script_name.casefold()
+
+    def __str__(self) -> str:
+        head, tail = os.path.split(self.path)
+        if not self.line:
+            return f'{tail}: {self.message}'
+        return f'{os.path.basename(head)}\\{tail}({self.line},{self.column}): {self.message}'
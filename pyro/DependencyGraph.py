@@ -0,0 +1,340 @@
+import hashlib
+import logging
+import os
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from pyro.FileIndex import FileIndex
+from pyro.PscInfo import PscInfo
+from pyro.PscScanner import PscScanner
+
+
+class DependencyGraph:
+    """
+    Directed graph of scripts and the scripts they depend on
+
+    Nodes are keyed by casefolded object name. Dependencies are resolved against
+    import paths in order, so scripts in import roots become nodes, too.
+    """
+    log: logging.Logger = logging.getLogger('pyro')
+
+    def __init__(self, import_paths: list, file_index: FileIndex) -> None:
+        self.import_paths: list = list(import_paths)
+        self.file_index: FileIndex = file_index
+
+        self.nodes: Dict[str, PscInfo] = {}
+        self.edges: Dict[str, Set[str]] = {}
+
+        self._keys_by_path: Dict[str, str] = {}
+        self._listings: Dict[str, dict] = {}
+        self._resolved: Dict[str, str] = {}
+        self._roots: Dict[str, str] = {}
+        self._linked: Set[str] = set()
+
+    @staticmethod
+    def _normalize_path(path: str) -> str:
+        return os.path.normcase(os.path.normpath(path))
+
+    def _find_entry(self, folder_path: str, name: str) -> str:
+        """Returns path to child of folder matching name case-insensitively, or empty string"""
+        listing = self._listings.get(folder_path)
+
+        if listing is None:
+            listing = {entry.casefold(): entry for entry in self.file_index.list_names(folder_path)}
+            self._listings[folder_path] = listing
+
+        entry = listing.get(name.casefold())
+        return os.path.join(folder_path, entry) if entry else ''
+
+    def _find_script_path(self, name: str) -> str:
+        """Returns path to first script in import paths matching object name, or empty string"""
+        script_path, _ = self._find_script(name)
+        return script_path
+
+    def _find_script(self, name: str) -> Tuple[str, str]:
+        """Returns path to first script in import paths matching object name and its import path, or empty strings"""
+        *namespaces, script_name = name.split(':')
+
+        for import_path in self.import_paths:
+            folder_path = import_path
+
+            for namespace in namespaces:
+                folder_path = self._find_entry(folder_path, namespace)
+                if not folder_path:
+                    break
+            else:
+                script_path = self._find_entry(folder_path, f'{script_name}.psc')
+                if script_path:
+                    return script_path, import_path
+
+        return '', ''
+
+    def _resolve(self, name: str) -> str:
+        """Returns key of script for name, scanning the script if needed, or empty string"""
+        name = name.casefold()
+
+        if name in self.nodes:
+            return name
+
+        if name in self._resolved:
+            return self._resolved[name]
+
+        key = ''
+
+        script_path = self._find_script_path(name)
+        if script_path:
+            key = self._add(script_path)
+
+        self._resolved[name] = key
+        return key
+
+    def _add(self, script_path: str) -> str:
+        normalized_path = self._normalize_path(script_path)
+
+        key = self._keys_by_path.get(normalized_path)
+        if key is not None:
+            return key
+
+        try:
+            info = PscScanner.scan(script_path)
+        except OSError as e:
+            DependencyGraph.log.warning(f'Cannot scan script for dependencies: "{script_path}" ({e.strerror})')
+            info = PscInfo(path=script_path, object_name=os.path.splitext(os.path.basename(script_path))[0])
+
+        key = info.object_name.casefold()
+
+        # first script wins, like the compiler's import order
+        if key in self.nodes:
+            self._keys_by_path[normalized_path] = key
+            return key
+
+        self.nodes[key] = info
+        self.edges[key] = set()
+        self._keys_by_path[normalized_path] = key
+
+        return key
+
+    def _link(self, pending: list) -> None:
+        """Resolves dependencies of scripts, and transitively of new scripts they depend on"""
+        while pending:
+            key = pending.pop()
+
+            if key in self._linked:
+                continue
+            self._linked.add(key)
+
+            for name in self.nodes[key].dependencies:
+                dependency_key = self._resolve(name)
+                if dependency_key and dependency_key != key:
+                    self.edges[key].add(dependency_key)
+                    pending.append(dependency_key)
+
+    def add_scripts(self, script_paths: Iterable[str]) -> None:
+        """Scans scripts and, transitively, every script they depend on"""
+        self._link([self._add(script_path) for script_path in script_paths])
+
+    def update_scripts(self, script_paths: Iterable[str]) -> bool:
+        """
+        Rescans modified scripts that are already in the graph and resolves their dependencies again
+
+        Returns False if a script no longer has the same object name, in which case the graph must be rebuilt.
+        """
+        keys: list = []
+
+        for script_path in script_paths:
+            key = self.get_key(script_path)
+            if not key or self._normalize_path(self.nodes[key].path) != self._normalize_path(script_path):
+                continue
+
+            try:
+                info = PscScanner.scan(script_path)
+            except OSError:
+                return False
+
+            if info.object_name.casefold() != key:
+                return False
+
+            self.nodes[key] = info
+            self.edges[key] = set()
+            self._linked.discard(key)
+            keys.append(key)
+
+        self._link(keys)
+
+        return True
+
+    def get_key(self, script_path: str) -> str:
+        """Returns key of scanned script at path, or empty string"""
+        return self._keys_by_path.get(self._normalize_path(script_path), '')
+
+    def get_root(self, key: str) -> str:
+        """Returns import path from which the compiler resolves script, or empty string"""
+        root = self._roots.get(key)
+
+        if root is None:
+            _, root = self._find_script(self.nodes[key].object_name)
+            self._roots[key] = root
+
+        return root
+
+    def get_import_roots(self) -> Dict[str, Set[str]]:
+        """Returns, for each script key, the import paths that hold the script and every script it depends on"""
+        component_of: Dict[str, int] = {}
+        roots: Dict[int, frozenset] = {}
+
+        for i, component in enumerate(self.get_components()):
+            for key in component:
+                component_of[key] = i
+
+            component_roots: set = {self.get_root(key) for key in component}
+            for key in component:
+                for child in self.edges[key]:
+                    j = component_of[child]
+                    if j != i:
+                        component_roots.update(roots[j])
+
+            component_roots.discard('')
+            roots[i] = frozenset(component_roots)
+
+        return {key: set(roots[component_of[key]]) for key in self.nodes}
+
+    def get_components(self) -> List[List[str]]:
+        """Returns strongly connected components in reverse topological order (dependencies first)"""
+        index: Dict[str, int] = {}
+        low_link: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: list = []
+        components: list = []
+
+        for root in self.nodes:
+            if root in index:
+                continue
+
+            index[root] = low_link[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work: list = [(root, iter(self.edges[root]))]
+
+            while work:
+                key, children = work[-1]
+
+                for child in children:
+                    if child not in index:
+                        index[child] = low_link[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.edges[child])))
+                        break
+                    if child in on_stack:
+                        low_link[key] = min(low_link[key], index[child])
+                else:
+                    work.pop()
+
+                    if work:
+                        parent_key = work[-1][0]
+                        low_link[parent_key] = min(low_link[parent_key], low_link[key])
+
+                    if low_link[key] == index[key]:
+                        component: list = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == key:
+                                break
+                        components.append(component)
+
+        return components
+
+    def get_closure_hashes(self, hash_file: Callable[[str], str]) -> Dict[str, str]:
+        """
+        Returns, for each script key, a hash of its source and the sources of every script it depends on
+
+        When any script changes, the hashes of all scripts that depend on it, directly or
+        transitively, change with it.
+        """
+        component_of: Dict[str, int] = {}
+        hashes: Dict[int, str] = {}
+
+        for i, component in enumerate(self.get_components()):
+            for key in component:
+                component_of[key] = i
+
+            parts: list = sorted(hash_file(self.nodes[key].path) for key in component)
+            parts.extend(sorted({hashes[component_of[child]]
+                                 for key in component
+                                 for child in self.edges[key]
+                                 if component_of[child] != i}))
+
+            hashes[i] = hashlib.sha1('\n'.join(parts).encode('ascii')).hexdigest()
+
+        return {key: hashes[component_of[key]] for key in self.nodes}
+
+    def get_blockers(self, script_paths: Iterable[str]) -> Dict[str, Set[str]]:
+        """
+        Returns, for each script path, the given script paths that must be compiled first
+
+        Dependencies are followed through scripts that are not given, and only the
+        nearest given scripts on each path are returned. Scripts in a dependency cycle
+        do not block each other.
+        """
+        script_paths = list(script_paths)
+
+        keys: Dict[str, str] = {}
+        for script_path in script_paths:
+            key = self.get_key(script_path)
+            if key:
+                keys[key] = script_path
+
+        bits: Dict[str, int] = {key: 1 << i for i, key in enumerate(keys)}
+        paths_by_bit: list = list(keys.values())
+
+        # nearest[i] is the bit set of the closest given scripts reachable from component i
+        component_of: Dict[str, int] = {}
+        members: Dict[int, int] = {}
+        nearest: Dict[int, int] = {}
+
+        for i, component in enumerate(self.get_components()):
+            members[i] = 0
+            for key in component:
+                component_of[key] = i
+                members[i] |= bits.get(key, 0)
+
+            reachable = 0
+            for key in component:
+                for child in self.edges[key]:
+                    j = component_of[child]
+                    if j != i:
+                        reachable |= members[j] if members[j] else nearest[j]
+
+            nearest[i] = reachable
+
+        blockers: Dict[str, Set[str]] = {script_path: set() for script_path in script_paths}
+
+        for key, script_path in keys.items():
+            mask = nearest[component_of[key]]
+            blockers[script_path] = {paths_by_bit[i] for i in range(mask.bit_length()) if mask >> i & 1}
+
+        return blockers
+
+    @staticmethod
+    def get_waves(blockers: Dict[str, Set[str]]) -> List[List[str]]:
+        """Returns script paths grouped into waves where each wave depends only on earlier waves"""
+        remaining: Dict[str, Set[str]] = {script_path: set(paths) for script_path, paths in blockers.items()}
+        waves: list = []
+
+        while remaining:
+            wave: list = [script_path for script_path, paths in remaining.items() if not paths]
+
+            if not wave:
+                # guard against malformed input; cycles are collapsed before blockers are returned
+                wave = list(remaining)
+
+            for script_path in wave:
+                del remaining[script_path]
+
+            for paths in remaining.values():
+                paths.difference_update(wave)
+
+            waves.append(wave)
+
+        return waves
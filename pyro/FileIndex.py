@@ -0,0 +1,237 @@
+import fnmatch
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class FileIndex:
+    """
+    Cache of folder contents shared by script discovery and packaging
+
+    Each folder is read once with os.scandir. File names are bucketed by casefolded
+    extension, so that queries for one file type skip every other file.
+
+    Like glob.iglob, queries skip files and folders whose names start with a dot,
+    unless a glob pattern component also starts with a dot.
+
+    When a journal path is given, folder listings are saved with the modification
+    time of their folder. Later runs read a folder again only if its modification
+    time changed, so that unchanged folders cost one stat call each.
+    """
+    log: logging.Logger = logging.getLogger('pyro')
+
+    version: int = 1
+
+    # folders modified this recently may change again within the same timestamp, so they are not journaled
+    racy_interval_ns: int = 2 * 10 ** 9
+
+    def __init__(self, journal_path: str = '') -> None:
+        # normalized folder path -> (file names by extension, subfolder names)
+        self._folders: Dict[str, Tuple[Dict[str, List[str]], List[str]]] = {}
+
+        # normalized folder path -> [modification time, file names, subfolder names]
+        self._journal: Dict[str, list] = {}
+        self._journal_path: str = journal_path
+        self._journal_changed: bool = False
+
+        if self._journal_path:
+            self._load_journal()
+
+    @staticmethod
+    def _normalize_path(path: str) -> str:
+        return os.path.normcase(os.path.normpath(path))
+
+    @property
+    def folder_paths(self) -> List[str]:
+        """Returns normalized paths to indexed folders"""
+        return list(self._folders)
+
+    def clear(self) -> None:
+        """Forgets indexed folders, so that files written since they were indexed are seen"""
+        self._folders.clear()
+
+    def _load_journal(self) -> None:
+        try:
+            with open(self._journal_path, encoding='utf-8') as f:
+                data: dict = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            FileIndex.log.warning(f'Cannot load folder journal: "{self._journal_path}" ({e})')
+            return
+
+        if data.get('version') == self.version:
+            self._journal = data.get('folders', {})
+
+    def save_journal(self) -> None:
+        """Saves folder listings, if any folder was read since the journal was loaded or saved"""
+        if not self._journal_path or not self._journal_changed:
+            return
+
+        os.makedirs(os.path.dirname(self._journal_path), exist_ok=True)
+
+        temp_path = f'{self._journal_path}.tmp'
+
+        try:
+            with open(temp_path, mode='w', encoding='utf-8') as f:
+                json.dump({'version': self.version, 'folders': self._journal}, f, sort_keys=True)
+            os.replace(temp_path, self._journal_path)
+        except OSError as e:
+            FileIndex.log.warning(f'Cannot save folder journal: "{self._journal_path}" ({e.strerror})')
+        else:
+            self._journal_changed = False
+
+    @staticmethod
+    def _scan_folder(folder_path: str) -> Tuple[List[str], List[str]]:
+        """Returns names of files and subfolders in folder"""
+        file_names: List[str] = []
+        subfolder_names: List[str] = []
+
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    subfolder_names.append(entry.name)
+                elif entry.is_file():
+                    file_names.append(entry.name)
+
+        return file_names, subfolder_names
+
+    def _read_folder(self, key: str, folder_path: str) -> Tuple[List[str], List[str]]:
+        """Returns names of files and subfolders in folder, from the journal if the folder has not been modified"""
+        if not self._journal_path:
+            try:
+                return self._scan_folder(folder_path)
+            except OSError:
+                return [], []
+
+        try:
+            mtime: int = os.stat(folder_path).st_mtime_ns
+        except OSError:
+            if self._journal.pop(key, None) is not None:
+                self._journal_changed = True
+            return [], []
+
+        entry: Optional[list] = self._journal.get(key)
+        if entry is not None and entry[0] == mtime:
+            return entry[1], entry[2]
+
+        try:
+            file_names, subfolder_names = self._scan_folder(folder_path)
+        except OSError:
+            return [], []
+
+        if time.time_ns() - mtime >= self.racy_interval_ns:
+            self._journal[key] = [mtime, file_names, subfolder_names]
+            self._journal_changed = True
+        elif self._journal.pop(key, None) is not None:
+            self._journal_changed = True
+
+        return file_names, subfolder_names
+
+    def _get_folder(self, folder_path: str) -> Tuple[Dict[str, List[str]], List[str]]:
+        key = self._normalize_path(folder_path)
+
+        folder = self._folders.get(key)
+        if folder is not None:
+            return folder
+
+        file_names, subfolder_names = self._read_folder(key, folder_path)
+
+        files: Dict[str, List[str]] = {}
+        for file_name in file_names:
+            _, extension = os.path.splitext(file_name)
+            files.setdefault(extension.casefold(), []).append(file_name)
+
+        folder = (files, subfolder_names)
+        self._folders[key] = folder
+
+        return folder
+
+    @staticmethod
+    def _is_hidden(name: str) -> bool:
+        return name.startswith('.')
+
+    def _walk(self, folder_path: str, recursive: bool, include_hidden: bool) -> Iterator[str]:
+        """Yields folder path and, if recursive is True, every folder under it, in depth-first order"""
+        pending: list = [folder_path]
+
+        while pending:
+            path = pending.pop()
+            yield path
+            if recursive:
+                _, subfolder_names = self._get_folder(path)
+                pending.extend(os.path.join(path, name) for name in reversed(subfolder_names)
+                               if include_hidden or not self._is_hidden(name))
+
+    def find_files(self, folder_path: str, *, recursive: bool, extension: Optional[str] = None,
+                   include_hidden: bool = False) -> Iterator[str]:
+        """Yields paths to files in folder, optionally in every folder under it, and optionally with extension only"""
+        for path in self._walk(folder_path, recursive, include_hidden):
+            files, _ = self._get_folder(path)
+
+            if extension is not None:
+                file_names = files.get(extension.casefold(), ())
+            else:
+                file_names = [file_name for file_names in files.values() for file_name in file_names]
+
+            for file_name in file_names:
+                if include_hidden or not self._is_hidden(file_name):
+                    yield os.path.join(path, file_name)
+
+    def list_names(self, folder_path: str) -> List[str]:
+        """Returns names of files and subfolders in folder, or empty list if folder cannot be read"""
+        files, subfolder_names = self._get_folder(folder_path)
+        names: List[str] = list(subfolder_names)
+        names.extend(file_name for file_names in files.values() for file_name in file_names)
+        return names
+
+    @staticmethod
+    def _match_parts(parts: list, pattern_parts: list) -> bool:
+        """
+        Returns True if path components match glob pattern components, where ** matches any number of folders
+
+        Hidden components match only pattern components that start with a dot, as with glob.iglob.
+        """
+        if not pattern_parts:
+            return not parts
+
+        pattern_part, *rest = pattern_parts
+
+        if pattern_part == '**':
+            for i in range(len(parts) + 1):
+                if FileIndex._match_parts(parts[i:], rest):
+                    return True
+                if i < len(parts) and FileIndex._is_hidden(parts[i]):
+                    return False
+            return False
+
+        if not parts or (FileIndex._is_hidden(parts[0]) and not FileIndex._is_hidden(pattern_part)):
+            return False
+
+        return fnmatch.fnmatch(parts[0], pattern_part) and FileIndex._match_parts(parts[1:], rest)
+
+    def glob(self, pattern: str, *, recursive: bool) -> Iterator[str]:
+        """Yields paths to files matching absolute glob pattern, like glob.iglob, but from the index"""
+        pattern = os.path.normpath(pattern)
+        pattern_parts: list = pattern.split(os.sep)
+
+        # the folder before the first wildcard is the root of the search
+        i = next((i for i, part in enumerate(pattern_parts) if any(c in part for c in '*?[')), len(pattern_parts))
+        root_path: str = os.sep.join(pattern_parts[:i]) or os.sep
+
+        pattern_parts = pattern_parts[i:]
+        if not recursive:
+            # without recursion, ** means the same as *
+            pattern_parts = ['*' if part == '**' else part for part in pattern_parts]
+
+        search_recursive: bool = '**' in pattern_parts or len(pattern_parts) > 1
+
+        # hidden files are searched only if the pattern can match them, and then filtered by the pattern
+        include_hidden: bool = any(self._is_hidden(part) for part in pattern_parts)
+
+        for path in self.find_files(root_path, recursive=search_recursive, include_hidden=include_hidden):
+            relpath: str = os.path.relpath(path, root_path)
+            if self._match_parts(relpath.split(os.sep), pattern_parts):
+                yield path
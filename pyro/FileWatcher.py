@@ -0,0 +1,262 @@
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Set, Tuple
+
+
+class FileWatcher:
+    """
+    Reports files changed under a set of folders
+
+    Uses inotify on Linux and falls back to comparing folder snapshots elsewhere. Snapshots are
+    compared on a background thread, so that poll() returns changes without walking folders.
+    Import folders, which are large and rarely change, are compared less often than project folders.
+    Bursts of changes, such as an editor saving several files, are reported together
+    once no further changes have been seen for the debounce interval.
+    """
+    log: logging.Logger = logging.getLogger('pyro')
+
+    debounce_interval: float = 0.3
+    poll_interval: float = 0.5
+    import_poll_interval: float = 5.0
+
+    # reported when inotify drops events, since any watched file may have changed
+    overflow_path: str = '<overflow>'
+
+    # inotify(7)
+    IN_MODIFY: int = 0x00000002
+    IN_CLOSE_WRITE: int = 0x00000008
+    IN_MOVED_FROM: int = 0x00000040
+    IN_MOVED_TO: int = 0x00000080
+    IN_CREATE: int = 0x00000100
+    IN_DELETE: int = 0x00000200
+    IN_DELETE_SELF: int = 0x00000400
+    IN_MOVE_SELF: int = 0x00000800
+    IN_Q_OVERFLOW: int = 0x00004000
+    IN_IGNORED: int = 0x00008000
+    IN_ISDIR: int = 0x40000000
+    IN_NONBLOCK: int = 0x00000800
+    IN_CLOEXEC: int = 0x00080000
+
+    event_header: struct.Struct = struct.Struct('iIII')
+
+    def __init__(self, folder_paths: Iterable[str], import_paths: Iterable[str] = ()) -> None:
+        self.project_paths: list = [path for path in folder_paths if os.path.isdir(path)]
+        self.import_paths: list = [path for path in import_paths if os.path.isdir(path)]
+        self.folder_paths: list = self.project_paths + self.import_paths
+
+        self._fd: int = -1
+        self._libc = None
+        self._watches: Dict[int, str] = {}
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+        self._import_snapshot: Dict[str, Tuple[int, int]] = {}
+
+        self._pending: Set[str] = set()
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._poller = None
+
+        if sys.platform.startswith('linux'):
+            self._try_init_inotify()
+
+        if self._fd < 0:
+            self._snapshot = self._take_snapshot(self.project_paths)
+            self._import_snapshot = self._take_snapshot(self.import_paths)
+            self._poller = threading.Thread(target=self._run_poller, name='pyro-watcher', daemon=True)
+            self._poller.start()
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._fd >= 0
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+        if self._poller is not None:
+            self._stopped.set()
+            self._poller.join()
+            self._poller = None
+
+    def _try_init_inotify(self) -> None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd: int = libc.inotify_init1(FileWatcher.IN_NONBLOCK | FileWatcher.IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return
+
+        if fd < 0:
+            return
+
+        self._libc = libc
+        self._fd = fd
+
+        for folder_path in self.folder_paths:
+            self._add_watches(folder_path)
+
+    def _add_watch(self, folder_path: str) -> None:
+        mask: int = FileWatcher.IN_CLOSE_WRITE | FileWatcher.IN_MODIFY | FileWatcher.IN_CREATE | FileWatcher.IN_DELETE \
+            | FileWatcher.IN_MOVED_FROM | FileWatcher.IN_MOVED_TO | FileWatcher.IN_DELETE_SELF | FileWatcher.IN_MOVE_SELF
+
+        wd: int = self._libc.inotify_add_watch(self._fd, os.fsencode(folder_path), mask)
+
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                FileWatcher.log.warning('Cannot watch all folders because the inotify watch limit was reached')
+            return
+
+        self._watches[wd] = folder_path
+
+    def _add_watches(self, folder_path: str) -> None:
+        """Watches folder and every folder under it"""
+        pending: list = [folder_path]
+
+        while pending:
+            path = pending.pop()
+            self._add_watch(path)
+            try:
+                with os.scandir(path) as entries:
+                    pending.extend(entry.path for entry in entries if entry.is_dir(follow_symlinks=False))
+            except OSError:
+                continue
+
+    @staticmethod
+    def _take_snapshot(folder_paths: list) -> Dict[str, Tuple[int, int]]:
+        snapshot: Dict[str, Tuple[int, int]] = {}
+        pending: list = list(folder_paths)
+
+        while pending:
+            path = pending.pop()
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                            continue
+                        stat = entry.stat()
+                        snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                continue
+
+        return snapshot
+
+    def _run_poller(self) -> None:
+        """Compares snapshots every poll interval and adds changed paths to pending changes until closed"""
+        import_time: float = time.monotonic() + self.import_poll_interval
+
+        while not self._stopped.wait(self.poll_interval):
+            snapshot = self._take_snapshot(self.project_paths)
+            changed_paths: Set[str] = self._compare_snapshots(self._snapshot, snapshot)
+            self._snapshot = snapshot
+
+            if self.import_paths and time.monotonic() >= import_time:
+                snapshot = self._take_snapshot(self.import_paths)
+                changed_paths.update(self._compare_snapshots(self._import_snapshot, snapshot))
+                self._import_snapshot = snapshot
+                import_time = time.monotonic() + self.import_poll_interval
+
+            if changed_paths:
+                with self._condition:
+                    self._pending.update(changed_paths)
+                    self._condition.notify_all()
+
+    @staticmethod
+    def _compare_snapshots(old_snapshot: dict, new_snapshot: dict) -> Set[str]:
+        """Returns paths added, changed, or removed between snapshots"""
+        changed_paths: Set[str] = {path for path, stat in new_snapshot.items() if old_snapshot.get(path) != stat}
+        changed_paths.update(path for path in old_snapshot if path not in new_snapshot)
+        return changed_paths
+
+    def _poll(self, timeout: float) -> Set[str]:
+        """Returns pending changes, waiting up to timeout for the background thread to find changes"""
+        with self._condition:
+            if not self._pending and timeout > 0:
+                self._condition.wait(timeout)
+
+            changed_paths, self._pending = self._pending, set()
+
+        return changed_paths
+
+    def _read_events(self, timeout: float) -> Set[str]:
+        changed_paths: Set[str] = set()
+
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return changed_paths
+
+        while True:
+            try:
+                data: bytes = os.read(self._fd, 1 << 16)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, name_size = FileWatcher.event_header.unpack_from(data, offset)
+                offset += FileWatcher.event_header.size
+                name: str = os.fsdecode(data[offset:offset + name_size].rstrip(b'\0'))
+                offset += name_size
+
+                if mask & FileWatcher.IN_Q_OVERFLOW:
+                    # events were dropped, so which files changed is unknown
+                    changed_paths.add(FileWatcher.overflow_path)
+                    continue
+
+                folder_path = self._watches.get(wd)
+                if folder_path is None:
+                    continue
+
+                if mask & FileWatcher.IN_IGNORED:
+                    del self._watches[wd]
+                    continue
+
+                path = os.path.join(folder_path, name) if name else folder_path
+
+                if mask & FileWatcher.IN_ISDIR and mask & (FileWatcher.IN_CREATE | FileWatcher.IN_MOVED_TO):
+                    self._add_watches(path)
+
+                changed_paths.add(path)
+
+        return changed_paths
+
+    def _collect(self, timeout: float) -> Set[str]:
+        if self._fd >= 0:
+            return self._read_events(timeout)
+        return self._poll(timeout)
+
+    def poll(self) -> Set[str]:
+        """Returns paths changed since last call without waiting"""
+        changed_paths: Set[str] = set()
+
+        while True:
+            more_paths = self._collect(0.0)
+            if not more_paths:
+                return changed_paths
+            changed_paths.update(more_paths)
+
+    def wait(self) -> Set[str]:
+        """Blocks until files change, then returns paths changed before changes stopped for the debounce interval"""
+        changed_paths: Set[str] = set()
+
+        while not changed_paths:
+            changed_paths = self._collect(self.poll_interval if self._fd < 0 else 3600.0)
+
+        # snapshots are compared once per poll interval, so polling waits that long for further changes
+        debounce_interval: float = self.debounce_interval
+        if self._fd < 0:
+            debounce_interval += self.poll_interval
+
+        while True:
+            more_paths = self._collect(debounce_interval)
+            if not more_paths:
+                return changed_paths
+            changed_paths.update(more_paths)
@@ -0,0 +1,75 @@
+import logging
+import os
+import struct
+
+from pyro.PexFile import PexFile
+
+
+class Normalizer:
+    """
+    Rewrites compile-time metadata in compiled scripts to stable values
+
+    The compilation time, the source modification time in debug info, and the
+    source path, user name, and computer name would otherwise differ between
+    builds of the same source, so that unchanged scripts would not be byte-identical.
+    """
+    log: logging.Logger = logging.getLogger('pyro')
+
+    user_name: str = 'pyro'
+    computer_name: str = 'PYRO'
+
+    @staticmethod
+    def get_timestamp(seed: str) -> int:
+        """Returns timestamp derived from hexadecimal hash of script inputs"""
+        return int(seed[:8], 16)
+
+    @staticmethod
+    def normalize_script(path: str, script_name: str, seed: str) -> bool:
+        """
+        Rewrites metadata in compiled script, where script name is the import-relative source path
+
+        Returns True if script was rewritten, or False if it was already normalized or cannot be read.
+        """
+        try:
+            with open(path, mode='rb') as f:
+                data: bytes = f.read()
+
+            pex_file = PexFile(data, path)
+        except (OSError, ValueError) as e:
+            Normalizer.log.warning(f'Cannot normalize script: "{path}" ({e})')
+            return False
+
+        header = pex_file.header
+        byte_order: str = '<' if header.endianness == 'little' else '>'
+        timestamp: int = Normalizer.get_timestamp(seed)
+
+        fields = bytearray(data[:header.compilation_time.offset])
+        fields += struct.pack(f'{byte_order}Q', timestamp)
+
+        for value in (script_name.replace('/', '\\'), Normalizer.user_name, Normalizer.computer_name):
+            encoded_value: bytes = value.encode('ascii')
+            fields += struct.pack(f'{byte_order}H', len(encoded_value)) + encoded_value
+
+        # nothing after the header refers to absolute offsets, so the header can change size
+        body = bytearray(data[header.size:])
+
+        debug_info_offset: int = pex_file.debug_info_offset - header.size
+        if body[debug_info_offset]:
+            struct.pack_into(f'{byte_order}Q', body, debug_info_offset + 1, timestamp)
+
+        result: bytes = bytes(fields + body)
+
+        if result == data:
+            return False
+
+        temp_path = f'{path}.tmp'
+
+        try:
+            with open(temp_path, mode='wb') as f:
+                f.write(result)
+            os.replace(temp_path, path)
+        except OSError as e:
+            Normalizer.log.warning(f'Cannot normalize script: "{path}" ({e.strerror})')
+            return False
+
+        return True
@@ -1,14 +1,18 @@
 import fnmatch
-import glob
+import functools
 import logging
 import os
 import shutil
 import sys
 import typing
 import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 
 from lxml import etree
 
+from pyro.Ba2Writer import Ba2Writer
+from pyro.BsaWriter import BsaWriter
+from pyro.BuildManifest import BuildManifest
 from pyro.CommandArguments import CommandArguments
 from pyro.Comparators import (endswith,
                               is_include_node,
@@ -17,7 +21,9 @@ from pyro.Comparators import (endswith,
                               startswith)
 from pyro.CaseInsensitiveList import CaseInsensitiveList
 from pyro.Enums.GameType import GameType
+from pyro.Enums.ProcessState import ProcessState
 from pyro.Enums.ZipCompression import ZipCompression
+from pyro.PackageManifest import PackageManifest
 from pyro.PapyrusProject import PapyrusProject
 from pyro.PathHelper import PathHelper
 from pyro.ProcessManager import ProcessManager
@@ -31,6 +37,7 @@ class PackageManager:
     options: ProjectOptions = None
     pak_extension: str = ''
     zip_extension: str = ''
+    writer_worker_limit: int = 0
 
     def __init__(self, ppj: PapyrusProject) -> None:
         self.ppj = ppj
@@ -48,11 +55,17 @@ class PackageManager:
                 PackageManager.log.error(f'Cannot create file without write permission to: "{file_path}"')
                 sys.exit(1)
 
-    @staticmethod
-    def _generate_include_paths(includes_node: etree.ElementBase, root_path: str) -> typing.Generator:
+    def _generate_include_paths(self, includes_node: etree.ElementBase, root_path: str) -> typing.Generator:
+        """Yields include paths, excluding files in Pyro state folders"""
+        state_folder: str = f'{os.sep}.pyro{os.sep}'
+
+        for include_path in self._resolve_include_paths(includes_node, root_path):
+            if state_folder not in os.path.normcase(include_path):
+                yield include_path
+
+    def _resolve_include_paths(self, includes_node: etree.ElementBase, root_path: str) -> typing.Generator:
         for include_node in filter(is_include_node, includes_node):
             no_recurse: bool = include_node.get('NoRecurse') == 'True'
-            wildcard_pattern: str = '*' if no_recurse else r'**\*'
 
             if include_node.text.startswith(os.pardir):
                 PackageManager.log.warning(f'Include paths cannot start with "{os.pardir}"')
@@ -67,15 +80,15 @@ class PackageManager:
             # populate files list using simple glob patterns
             if '*' in path_or_pattern:
                 if not os.path.isabs(path_or_pattern):
-                    search_path = os.path.join(root_path, wildcard_pattern)
+                    search_paths = self.ppj.file_index.find_files(root_path, recursive=not no_recurse)
                 elif root_path in path_or_pattern:
-                    search_path = path_or_pattern
+                    search_paths = self.ppj.file_index.glob(path_or_pattern, recursive=not no_recurse)
                 else:
                     PackageManager.log.warning(f'Cannot include path outside RootDir: "{path_or_pattern}"')
                     continue
 
-                for include_path in glob.iglob(search_path, recursive=not no_recurse):
-                    if os.path.isfile(include_path) and fnmatch.fnmatch(include_path, path_or_pattern):
+                for include_path in search_paths:
+                    if fnmatch.fnmatch(include_path, path_or_pattern):
                         yield include_path
 
             # populate files list using absolute paths
@@ -87,8 +100,7 @@ class PackageManager:
                 if os.path.isfile(path_or_pattern):
                     yield path_or_pattern
                 else:
-                    search_path = os.path.join(path_or_pattern, wildcard_pattern)
-                    yield from PathHelper.find_include_paths(search_path, no_recurse)
+                    yield from self.ppj.file_index.find_files(path_or_pattern, recursive=not no_recurse)
 
             else:
                 # populate files list using relative file path
@@ -98,8 +110,7 @@ class PackageManager:
 
                 # populate files list using relative folder path
                 else:
-                    search_path = os.path.join(root_path, path_or_pattern, wildcard_pattern)
-                    yield from PathHelper.find_include_paths(search_path, no_recurse)
+                    yield from self.ppj.file_index.find_files(test_path, recursive=not no_recurse)
 
     def _fix_package_extension(self, package_name: str) -> str:
         if not endswith(package_name, ('.ba2', '.bsa'), ignorecase=True):
@@ -119,9 +130,9 @@ class PackageManager:
 
         return test_path if os.path.isdir(test_path) else ''
 
-    def build_commands(self, containing_folder: str, output_path: str) -> str:
+    def build_commands(self, containing_folder: str, output_path: str, source_paths: list) -> list:
         """
-        Builds command for creating package with BSArch
+        Builds command for creating package with BSArch from files linked from source paths
         """
         arguments = CommandArguments()
 
@@ -131,37 +142,115 @@ class PackageManager:
         arguments.append(output_path, enquote_value=True)
 
         if self.options.game_type == GameType.FO4:
-            arguments.append('-fo4')
+            if all(endswith(source_path, '.dds', ignorecase=True) for source_path in source_paths):
+                arguments.append('-fo4dds')
+            else:
+                arguments.append('-fo4')
         elif self.options.game_type == GameType.SSE:
             arguments.append('-sse')
 
             # SSE has an ctd bug with uncompressed textures in a bsa that
             # has an Embed Filenames flag on it, so force it to false.
-            has_textures = False
-            
-            for f in glob.iglob(os.path.join(containing_folder, r'**/*'), recursive=True):
-                if not os.path.isfile(f):
-                    continue
-                if endswith(f, '.dds', ignorecase=True):
-                    has_textures = True
-                    break
+            has_textures = any(endswith(source_path, '.dds', ignorecase=True) for source_path in source_paths)
 
             if has_textures:
                 arguments.append('-af:0x3')
         else:
             arguments.append('-tes5')
 
-        return arguments.join()
+        return arguments.split()
 
-    def create_packages(self) -> None:
-        # clear temporary data
-        if os.path.isdir(self.options.temp_path):
-            shutil.rmtree(self.options.temp_path, ignore_errors=True)
+    def create_outputs(self, packages: bool, zip_files: bool) -> None:
+        """
+        Creates packages and zip files concurrently
+
+        Outputs are planned in order, so names and include paths resolve as they would one at a time.
+        Zip files whose RootDir contains the package folder may include packages, so they are planned
+        and written after packages are written. Messages are collected per output and logged together
+        when the output is finished.
+        """
+        package_outputs: list = self._plan_packages() if packages else []
+        zip_file_nodes: list = self._get_zip_files() if zip_files else []
+
+        waiting_zip_files: list = []
+        if package_outputs:
+            package_path: str = os.path.join(os.path.normpath(self.options.package_path), '')
+            for zip_file in zip_file_nodes:
+                zip_root_path: str = os.path.join(os.path.normpath(zip_file[3]), '')
+                if startswith(package_path, zip_root_path, ignorecase=True):
+                    waiting_zip_files.append(zip_file)
+
+        output_count: int = len(package_outputs) + len(zip_file_nodes)
+
+        if output_count == 0:
+            return
+
+        if self.options.no_parallel:
+            worker_count: int = 1
+        else:
+            worker_count = max(1, min(output_count, self.options.worker_limit))
+
+        # archive writers share workers with the other outputs
+        self.writer_worker_limit = max(1, self.options.worker_limit // worker_count)
+
+        failed_count: int = 0
 
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            package_futures: list = [executor.submit(self._create_output, file_path, write)
+                                     for file_path, write in package_outputs]
+
+            futures: list = package_futures + [executor.submit(self._create_output, *self._plan_zip_file(*zip_file))
+                                               for zip_file in zip_file_nodes if zip_file not in waiting_zip_files]
+
+            if waiting_zip_files:
+                wait(package_futures)
+
+                if any(future.result()[1] for future in package_futures):
+                    PackageManager.log.error(f'Cannot create {len(waiting_zip_files)} ZIP files that may include '
+                                             f'packages because packages failed')
+                    failed_count += len(waiting_zip_files)
+                else:
+                    # packages were written to a folder that may have been indexed before they existed
+                    self.ppj.file_index.clear()
+
+                    futures.extend(executor.submit(self._create_output, *self._plan_zip_file(*zip_file))
+                                   for zip_file in waiting_zip_files)
+
+            for future in as_completed(futures):
+                messages, error = future.result()
+
+                for level, message in messages:
+                    PackageManager.log.log(level, message)
+
+                if error:
+                    PackageManager.log.error(error)
+                    failed_count += 1
+
+        if failed_count > 0:
+            sys.exit(1)
+
+    @staticmethod
+    def _create_output(file_path: str, write: typing.Callable[[list], None]) -> typing.Tuple[list, str]:
+        """Writes output, and returns its messages and error, which is empty if output was written"""
+        messages: list = []
+
+        try:
+            write(messages)
+        except ValueError as e:
+            return messages, str(e)
+        except OSError as e:
+            return messages, f'Cannot write file "{file_path}" because: {e.strerror}'
+
+        return messages, ''
+
+    def _plan_packages(self) -> list:
+        """Returns output paths and write functions for packages"""
         # ensure package path exists
         if not os.path.isdir(self.options.package_path):
             os.makedirs(self.options.package_path, exist_ok=True)
 
+        outputs: list = []
+
         file_names = CaseInsensitiveList()
 
         for i, package_node in enumerate(filter(is_package_node, self.ppj.packages_node)):
@@ -180,34 +269,89 @@ class PackageManager:
 
             self._check_write_permission(file_path)
 
-            PackageManager.log.info(f'Creating "{file_name}"...')
+            files: list = [(source_path, self._get_archive_path(source_path, package_node.get('RootDir')))
+                           for source_path in self._generate_include_paths(package_node, package_node.get('RootDir'))]
+
+            outputs.append((file_path, functools.partial(self._write_package, file_name, file_path, files)))
 
-            for source_path in self._generate_include_paths(package_node, package_node.get('RootDir')):
-                PackageManager.log.info(f'+ "{source_path}"')
+        return outputs
 
-                relpath = os.path.relpath(source_path, package_node.get('RootDir'))
-                target_path = os.path.join(self.options.temp_path, relpath)
+    def _write_package(self, file_name: str, file_path: str, files: list, messages: list) -> None:
+        manifest = PackageManifest(self.ppj.get_package_manifest_path(file_path))
+        file_hashes: dict = manifest.hash_files([source_path for source_path, _ in files])
 
-                # fix target path if user passes a deeper package root (RootDir)
-                if endswith(source_path, '.pex', ignorecase=True) and not startswith(relpath, 'scripts', ignorecase=True):
-                    target_path = os.path.join(self.options.temp_path, 'Scripts', relpath)
+        key: str = BuildManifest.create_key(files=[[archive_path, manifest.get_hash(file_hashes, source_path)]
+                                                   for source_path, archive_path in files],
+                                            game_type=self.options.game_type.name,
+                                            use_bsarch=self.options.use_bsarch)
 
-                os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                shutil.copy2(source_path, target_path)
+        if manifest.is_current(key, file_path):
+            messages.append((logging.INFO, f'Skipping "{file_name}" because its inputs have not changed'))
+            return
 
-            # run bsarch
-            command: str = self.build_commands(self.options.temp_path, file_path)
-            ProcessManager.run_bsarch(command)
+        messages.append((logging.INFO, f'Creating "{file_name}"...'))
+        messages.extend((logging.INFO, f'+ "{source_path}"') for source_path, _ in files)
 
-            # clear temporary data
-            if os.path.isdir(self.options.temp_path):
-                shutil.rmtree(self.options.temp_path, ignore_errors=True)
+        if self.options.use_bsarch:
+            # each package is staged in its own folder, so packages can be created at the same time
+            staging_path: str = os.path.join(self.options.temp_path, file_name)
+            state: ProcessState = self._run_bsarch(staging_path, file_path, files,
+                                                   lambda line: messages.append((logging.INFO, line)))
 
-    def create_zip(self) -> None:
+            if state != ProcessState.SUCCESS:
+                raise ValueError(f'Cannot create package because BSArch did not succeed: "{file_path}"')
+        else:
+            if self.options.game_type == GameType.FO4:
+                file_count: int = Ba2Writer(worker_limit=self.writer_worker_limit).write(file_path, files)
+            else:
+                version: int = BsaWriter.SSE if self.options.game_type == GameType.SSE else BsaWriter.TES5
+                file_count = BsaWriter(version, worker_limit=self.writer_worker_limit).write(file_path, files)
+
+            messages.append((logging.INFO, f'Wrote {file_count} files to package: "{file_path}"'))
+
+        manifest.update(key, file_path, file_hashes)
+        manifest.save()
+
+    @staticmethod
+    def _get_archive_path(source_path: str, root_path: str) -> str:
+        """Returns path of file in package, relative to package root"""
+        relpath = os.path.relpath(source_path, root_path)
+
+        # fix target path if user passes a deeper package root (RootDir)
+        if endswith(source_path, '.pex', ignorecase=True) and not startswith(relpath, 'scripts', ignorecase=True):
+            return os.path.join('Scripts', relpath)
+
+        return relpath
+
+    def _run_bsarch(self, staging_path: str, file_path: str, files: list,
+                    log: typing.Callable[[str], None]) -> ProcessState:
+        """Creates package with BSArch from files linked into staging folder"""
+        # clear temporary data
+        if os.path.isdir(staging_path):
+            shutil.rmtree(staging_path, ignore_errors=True)
+
+        # files are copied only when they cannot be linked, such as on another device without symlink permission
+        for source_path, archive_path in files:
+            PathHelper.link_or_copy(source_path, os.path.join(staging_path, archive_path), symlink=True)
+
+        # run bsarch
+        command: list = self.build_commands(staging_path, file_path, [source_path for source_path, _ in files])
+        state: ProcessState = ProcessManager.run_bsarch(command, log)
+
+        # clear temporary data
+        if os.path.isdir(staging_path):
+            shutil.rmtree(staging_path, ignore_errors=True)
+
+        return state
+
+    def _get_zip_files(self) -> list:
+        """Returns names, output paths, nodes, root paths, and compression of zip files"""
         # ensure zip output path exists
         if not os.path.isdir(self.options.zip_output_path):
             os.makedirs(self.options.zip_output_path, exist_ok=True)
 
+        zip_files: list = []
+
         file_names = CaseInsensitiveList()
 
         for i, zip_node in enumerate(filter(is_zipfile_node, self.ppj.zip_files_node)):
@@ -234,25 +378,60 @@ class PackageManager:
             root_dir: str = zip_node.get('RootDir')
             zip_root_path: str = self._try_resolve_project_relative_path(root_dir)
 
-            if zip_root_path:
-                PackageManager.log.info(f'Creating "{file_name}"...')
+            if not zip_root_path:
+                PackageManager.log.error(f'Cannot resolve RootDir path to existing folder: "{root_dir}"')
+                sys.exit(1)
 
-                try:
-                    with zipfile.ZipFile(file_path, mode='w', compression=compress_type.value) as z:
-                        for include_path in self._generate_include_paths(zip_node, zip_root_path):
-                            PackageManager.log.info(f'+ "{include_path}"')
+            zip_files.append((file_name, file_path, zip_node, zip_root_path, compress_type))
 
-                            if zip_root_path not in include_path:
-                                PackageManager.log.warning(f'Cannot add file to ZIP outside RootDir: "{include_path}"')
-                                continue
+        return zip_files
 
-                            arcname: str = os.path.relpath(include_path, zip_root_path)
-                            z.write(include_path, arcname, compress_type=compress_type.value)
+    def _plan_zip_file(self, file_name: str, file_path: str, zip_node: etree.ElementBase, zip_root_path: str,
+                       compress_type: ZipCompression) -> tuple:
+        """Returns output path and write function for zip file"""
+        include_paths: list = list(self._generate_include_paths(zip_node, zip_root_path))
 
-                    PackageManager.log.info(f'Wrote ZIP file: "{file_path}"')
-                except PermissionError:
-                    PackageManager.log.error(f'Cannot open ZIP file for writing: "{file_path}"')
-                    sys.exit(1)
-            else:
-                PackageManager.log.error(f'Cannot resolve RootDir path to existing folder: "{root_dir}"')
-                sys.exit(1)
+        return file_path, functools.partial(self._write_zip_file, file_name, file_path,
+                                            zip_root_path, include_paths, compress_type)
+
+    def _write_zip_file(self, file_name: str, file_path: str, zip_root_path: str, include_paths: list,
+                        compress_type: ZipCompression, messages: list) -> None:
+        manifest = PackageManifest(self.ppj.get_package_manifest_path(file_path))
+        file_hashes: dict = manifest.hash_files(include_paths)
+
+        key: str = BuildManifest.create_key(files=[[os.path.relpath(include_path, zip_root_path),
+                                                    manifest.get_hash(file_hashes, include_path)]
+                                                   for include_path in include_paths],
+                                            compression=compress_type.name)
+
+        if manifest.is_current(key, file_path):
+            messages.append((logging.INFO, f'Skipping "{file_name}" because its inputs have not changed'))
+            return
+
+        messages.append((logging.INFO, f'Creating "{file_name}"...'))
+
+        # the zip file is replaced only when it is complete, so failures do not leave partial files
+        temp_path = f'{file_path}.tmp'
+
+        try:
+            with zipfile.ZipFile(temp_path, mode='w', compression=compress_type.value) as z:
+                for include_path in include_paths:
+                    messages.append((logging.INFO, f'+ "{include_path}"'))
+
+                    if zip_root_path not in include_path:
+                        messages.append((logging.WARNING, f'Cannot add file to ZIP outside RootDir: "{include_path}"'))
+                        continue
+
+                    arcname: str = os.path.relpath(include_path, zip_root_path)
+                    z.write(include_path, arcname, compress_type=compress_type.value)
+            os.replace(temp_path, file_path)
+        except PermissionError:
+            raise ValueError(f'Cannot open ZIP file for writing: "{file_path}"')
+        finally:
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+
+        messages.append((logging.INFO, f'Wrote ZIP file: "{file_path}"'))
+
+        manifest.update(key, file_path, file_hashes)
+        manifest.save()
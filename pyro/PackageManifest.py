@@ -0,0 +1,117 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+
+class PackageManifest:
+    """
+    Persistent record of the inputs that produced a package or zip file
+
+    Outputs are written only when the key computed from their include list, file contents,
+    and archiver settings differs from the key recorded when the output was last written.
+    """
+    log: logging.Logger = logging.getLogger('pyro')
+
+    version: int = 1
+
+    # files modified this recently may change again without changing their modification time
+    racy_interval_ns: int = 2 * 10 ** 9
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.key: str = ''
+        self.output: list = []
+        self.files: dict = {}
+
+        self.load()
+
+    @staticmethod
+    def _normalize_path(path: str) -> str:
+        return os.path.normcase(os.path.normpath(path))
+
+    @staticmethod
+    def _get_stat(path: str) -> list:
+        """Returns size and modification time of file, or empty list if file does not exist"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return []
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def hash_files(self, paths: list) -> dict:
+        """Returns size, modification time, and content hash of files, reusing hashes of files that have not changed"""
+        results: dict = {}
+
+        for path in paths:
+            normalized_path = self._normalize_path(path)
+
+            if normalized_path in results:
+                continue
+
+            stat: list = self._get_stat(path)
+
+            entry: list = self.files.get(normalized_path)
+            if entry is not None and stat and entry[:2] == stat:
+                results[normalized_path] = entry
+                continue
+
+            sha1 = hashlib.sha1()
+
+            try:
+                with open(path, mode='rb') as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b''):
+                        sha1.update(chunk)
+            except OSError:
+                results[normalized_path] = [0, 0, '']
+                continue
+
+            # hashes of racy files are recorded without their stat, so they are hashed again next time
+            if not stat or time.time_ns() - stat[1] < self.racy_interval_ns:
+                stat = [-1, -1]
+
+            results[normalized_path] = [*stat, sha1.hexdigest()]
+
+        return results
+
+    def get_hash(self, files: dict, path: str) -> str:
+        """Returns content hash of file from results of hash_files"""
+        return files[self._normalize_path(path)][2]
+
+    def is_current(self, key: str, output_path: str) -> bool:
+        """Returns True if output was last written with the same key and has not changed since"""
+        return bool(self.key) and self.key == key and self._get_stat(output_path) == self.output
+
+    def update(self, key: str, output_path: str, files: dict) -> None:
+        self.key = key
+        self.output = self._get_stat(output_path)
+        self.files = files
+
+    def load(self) -> None:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data: dict = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            PackageManifest.log.warning(f'Cannot load package manifest, output will be written: "{self.path}" ({e})')
+            return
+
+        if data.get('version') == self.version:
+            self.key = data.get('key', '')
+            self.output = data.get('output', [])
+            self.files = data.get('files', {})
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        temp_path = f'{self.path}.tmp'
+
+        try:
+            with open(temp_path, mode='w', encoding='utf-8') as f:
+                json.dump({'version': self.version, 'key': self.key, 'output': self.output, 'files': self.files},
+                          f, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            PackageManifest.log.warning(f'Cannot save package manifest: "{self.path}" ({e.strerror})')
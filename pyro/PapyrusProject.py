@@ -3,23 +3,27 @@ import io
 import os
 import sys
 import typing
-from copy import deepcopy
 
 from lxml import etree
 
+from pyro.BuildManifest import BuildManifest
 from pyro.CommandArguments import CommandArguments
-from pyro.Comparators import (is_folder_node,
+from pyro.Comparators import (endswith,
+                              is_folder_node,
                               is_import_node,
                               is_script_node,
                               is_variable_node,
                               startswith)
+from pyro.DependencyGraph import DependencyGraph
 from pyro.Enums.GameType import GameType
+from pyro.FileIndex import FileIndex
 from pyro.PathHelper import PathHelper
-from pyro.PexReader import PexReader
 from pyro.ProjectBase import ProjectBase
 from pyro.ProjectOptions import ProjectOptions
+from pyro.ProjectSnapshot import ProjectSnapshot
 from pyro.Remotes import (GenericRemote,
                           RemoteBase)
+from pyro.ScriptIndex import ScriptIndex
 from pyro.XmlHelper import XmlHelper
 from pyro.XmlRoot import XmlRoot
 
@@ -42,12 +46,21 @@ class PapyrusProject(ProjectBase):
     has_pre_build_node: bool = False
     has_post_build_node: bool = False
 
+    build_manifest: BuildManifest = None
+    dependency_graph: DependencyGraph = None
+    file_index: FileIndex = None
     remote: RemoteBase = None
+    script_index: ScriptIndex = None
     remote_schemas: tuple = ('https:', 'http:')
 
     zip_file_name: str = ''
     zip_root_path: str = ''
 
+    compile_import_paths: dict = {}
+    script_import_roots: dict = {}
+    flags_import_path: str = ''
+    compile_keys: dict = {}
+    dependency_hashes: dict = {}
     missing_scripts: dict = {}
     pex_paths: list = []
     psc_paths: dict = {}
@@ -55,40 +68,28 @@ class PapyrusProject(ProjectBase):
     def __init__(self, options: ProjectOptions) -> None:
         super(PapyrusProject, self).__init__(options)
 
-        xml_parser: etree.XMLParser = etree.XMLParser(remove_blank_text=True, remove_comments=True)
-
-        # strip comments from raw text because lxml.etree.XMLParser does not remove XML-unsupported comments
-        # e.g., '<PapyrusProject <!-- xmlns="PapyrusProject.xsd" -->>'
-        xml_document: io.StringIO = XmlHelper.strip_xml_comments(self.options.input_path)
-
-        project_xml: etree.ElementTree = etree.parse(xml_document, xml_parser)
-
-        self.ppj_root = XmlRoot(project_xml)
+        # folder listings from previous builds are reused for folders that have not been modified
+        self.file_index = FileIndex(self.get_journal_path() if not self.options.no_snapshot else '')
 
-        schema: etree.XMLSchema = XmlHelper.validate_schema(self.ppj_root.ns, self.program_path)
-
-        if schema:
-            try:
-                schema.assertValid(project_xml)
-            except etree.DocumentInvalid as e:
-                PapyrusProject.log.error(f'Failed to validate XML Schema.{os.linesep}\t{e}')
-                sys.exit(1)
-            else:
-                PapyrusProject.log.info('Successfully validated XML Schema.')
-
-        # variables need to be parsed before nodes are updated
-        variables_node = self.ppj_root.find('Variables')
-        if variables_node is not None:
-            self._parse_variables(variables_node)
-
-        # we need to parse all attributes after validating and before we do anything else
-        # options can be overridden by arguments when the BuildFacade is initialized
-        self._update_attributes(self.ppj_root.node)
+        xml_parser: etree.XMLParser = etree.XMLParser(remove_blank_text=True, remove_comments=True)
 
-        if self.options.resolve_ppj:
-            xml_output = etree.tostring(self.ppj_root.node, encoding='utf-8', xml_declaration=True, pretty_print=True)
-            PapyrusProject.log.debug(f'Resolved PPJ. Text output:{os.linesep * 2}{xml_output.decode()}')
-            sys.exit(1)
+        # resolved projects are reused when nothing that affects how they resolve has changed
+        snapshot: typing.Optional[ProjectSnapshot] = None
+        snapshot_key: str = ''
+        state: typing.Optional[dict] = None
+
+        if not (self.options.no_snapshot or self.options.resolve_ppj or self.options.force_overwrite):
+            snapshot = ProjectSnapshot(self.get_snapshot_path())
+            snapshot_key = ProjectSnapshot.create_key(self.options.input_path,
+                                                      {key: value for key, value in self.options.__dict__.items() if key != 'args'})
+            state = snapshot.load(snapshot_key)
+
+        if state is not None:
+            PapyrusProject.log.info('Using resolved project from snapshot.')
+            self.ppj_root = XmlRoot(etree.ElementTree(etree.fromstring(state['xml'], xml_parser)))
+            self.variables.update(state['variables'])
+        else:
+            self._resolve_xml(xml_parser)
 
         self.options.flags_path = self.ppj_root.get('Flags')
         self.options.output_path = self.ppj_root.get('Output')
@@ -143,6 +144,88 @@ class PapyrusProject(ProjectBase):
                     PapyrusProject.log.error(f'Cannot proceed while node contains invalid URL: "{path}"')
                     sys.exit(1)
 
+        if state is not None:
+            self.import_paths = state['import_paths']
+            self.psc_paths = state['psc_paths']
+        else:
+            self._resolve_paths()
+            self.file_index.save_journal()
+
+            if snapshot is not None:
+                snapshot.save(snapshot_key, {
+                    'xml': etree.tostring(self.ppj_root.node, encoding='unicode'),
+                    'variables': self.variables,
+                    'import_paths': self.import_paths,
+                    'psc_paths': self.psc_paths
+                }, self._get_snapshot_folder_paths())
+
+        # we need to set the game type after imports are populated but before pex paths are populated
+        # allow xml to set game type but defer to passed argument
+        if not self.options.game_type:
+            game_type: str = self.ppj_root.get('Game', default='').upper()
+
+            if game_type and GameType.has_member(game_type):
+                valid_game_type: GameType = GameType[game_type]
+                PapyrusProject.log.warning(f'Using game type: {self.game_names[valid_game_type]} (determined from Papyrus Project)')
+                self.options.game_type = valid_game_type
+
+        if not self.options.game_type:
+            self.options.game_type = self.get_game_type()
+
+        if not self.options.game_type:
+            PapyrusProject.log.error('Cannot determine game type from arguments or Papyrus Project')
+            sys.exit(1)
+
+        # index scripts by object name to look up their compiled scripts without scanning lists
+        self.script_index = self._get_script_index()
+
+        # get expected pex paths - these paths may not exist and that is okay!
+        self.pex_paths = [entry.pex_path for entry in self.script_index]
+
+        # these are relative paths to psc scripts whose pex counterparts are missing
+        self.missing_scripts: dict = self._find_missing_script_paths()
+
+        # game type must be set before we call this
+        if not self.options.game_path:
+            self.options.game_path = self.get_game_path(self.options.game_type)
+
+    def _resolve_xml(self, xml_parser: etree.XMLParser) -> None:
+        """Parses and validates Papyrus Project, and resolves variables and default attributes"""
+        # strip comments from raw text because lxml.etree.XMLParser does not remove XML-unsupported comments
+        # e.g., '<PapyrusProject <!-- xmlns="PapyrusProject.xsd" -->>'
+        xml_document: io.StringIO = XmlHelper.strip_xml_comments(self.options.input_path)
+
+        project_xml: etree.ElementTree = etree.parse(xml_document, xml_parser)
+
+        self.ppj_root = XmlRoot(project_xml)
+
+        schema: etree.XMLSchema = XmlHelper.validate_schema(self.ppj_root.ns, self.program_path)
+
+        if schema:
+            try:
+                schema.assertValid(project_xml)
+            except etree.DocumentInvalid as e:
+                PapyrusProject.log.error(f'Failed to validate XML Schema.{os.linesep}\t{e}')
+                sys.exit(1)
+            else:
+                PapyrusProject.log.info('Successfully validated XML Schema.')
+
+        # variables need to be parsed before nodes are updated
+        variables_node = self.ppj_root.find('Variables')
+        if variables_node is not None:
+            self._parse_variables(variables_node)
+
+        # we need to parse all attributes after validating and before we do anything else
+        # options can be overridden by arguments when the BuildFacade is initialized
+        self._update_attributes(self.ppj_root.node)
+
+        if self.options.resolve_ppj:
+            xml_output = etree.tostring(self.ppj_root.node, encoding='utf-8', xml_declaration=True, pretty_print=True)
+            PapyrusProject.log.debug(f'Resolved PPJ. Text output:{os.linesep * 2}{xml_output.decode()}')
+            sys.exit(1)
+
+    def _resolve_paths(self) -> None:
+        """Populates import paths, including implicit import paths, and script paths"""
         # we need to populate the list of import paths before we try to determine the game type
         # because the game type can be determined from import paths
         self.import_paths = self._get_import_paths()
@@ -178,32 +261,11 @@ class PapyrusProject(ProjectBase):
 
             PathHelper.merge_implicit_import_paths(implicit_script_paths, self.import_paths)
 
-        # we need to set the game type after imports are populated but before pex paths are populated
-        # allow xml to set game type but defer to passed argument
-        if not self.options.game_type:
-            game_type: str = self.ppj_root.get('Game', default='').upper()
-
-            if game_type and GameType.has_member(game_type):
-                valid_game_type: GameType = GameType[game_type]
-                PapyrusProject.log.warning(f'Using game type: {self.game_names[valid_game_type]} (determined from Papyrus Project)')
-                self.options.game_type = valid_game_type
-
-        if not self.options.game_type:
-            self.options.game_type = self.get_game_type()
-
-        if not self.options.game_type:
-            PapyrusProject.log.error('Cannot determine game type from arguments or Papyrus Project')
-            sys.exit(1)
-
-        # get expected pex paths - these paths may not exist and that is okay!
-        self.pex_paths = self._get_pex_paths()
-
-        # these are relative paths to psc scripts whose pex counterparts are missing
-        self.missing_scripts: dict = self._find_missing_script_paths()
-
-        # game type must be set before we call this
-        if not self.options.game_path:
-            self.options.game_path = self.get_game_path(self.options.game_type)
+    def _get_snapshot_folder_paths(self) -> list:
+        """Returns folders whose contents determined the import paths and script paths"""
+        folder_paths: list = [self.project_path, *self.import_paths, *self.file_index.folder_paths]
+        folder_paths.extend(os.path.dirname(script_path) for script_path in self.psc_paths.values())
+        return folder_paths
 
     @property
     def remote_paths(self) -> list:
@@ -324,18 +386,95 @@ class PapyrusProject(ProjectBase):
         script_path = script_path.casefold()
         return script_path.startswith(import_path) and os.path.join(import_path, object_name) != script_path
 
-    def _find_missing_script_paths(self) -> dict:
-        """Returns list of script paths for compiled scripts that do not exist"""
-        results: dict = {}
+    def _get_script_import_paths(self, object_name: str, script_path: str) -> list:
+        """
+        Returns import paths, in project order, that hold the script, the scripts it depends on, and the flags file
 
-        for object_name, script_path in self.psc_paths.items():
-            pex_path: str = os.path.join(self.options.output_path, object_name.replace('.psc', '.pex'))
+        Other import paths cannot affect the compiled script, and leaving them out keeps
+        commands short and saves the compiler from searching them.
+        """
+        key: str = self.dependency_graph.get_key(script_path)
 
-            if not os.path.isfile(pex_path) and script_path not in results:
-                object_name = script_path if not os.path.isabs(script_path) else self._calculate_object_name(script_path)
-                results[object_name] = script_path
+        if not key:
+            needed_paths: set = set(self.import_paths)
+        else:
+            needed_paths = set(self.script_import_roots[key])
 
-        return results
+            if self.flags_import_path:
+                needed_paths.add(self.flags_import_path)
+
+            if self.options.game_type != GameType.FO4:
+                # scripts compiled by path are resolved from their own folder
+                script_folder_path = os.path.normcase(os.path.dirname(script_path))
+                needed_paths.update(import_path for import_path in self.import_paths
+                                    if os.path.normcase(os.path.normpath(import_path)) == script_folder_path)
+
+        import_paths: list = [import_path for import_path in self.import_paths if import_path in needed_paths]
+
+        # the compiler rejects scripts found in import paths that do not match their namespace
+        if self.options.game_type == GameType.FO4:
+            import_paths = [import_path for import_path in import_paths
+                            if not self._can_remove_folder(import_path, object_name, script_path)]
+
+        return import_paths
+
+    def _find_flags_import_path(self) -> str:
+        """Returns import path in which the compiler finds the flags file, or empty string"""
+        if os.path.isabs(self.options.flags_path):
+            return ''
+
+        for import_path in self.import_paths:
+            if os.path.isfile(os.path.join(import_path, self.options.flags_path)):
+                return import_path
+
+        return ''
+
+    def _find_flags_path(self, import_paths: list) -> str:
+        """Returns absolute path to flags file as the compiler would find it, or empty string"""
+        flags_path: str = self.options.flags_path
+
+        if os.path.isabs(flags_path):
+            return flags_path
+
+        for import_path in import_paths:
+            test_path = os.path.join(import_path, flags_path)
+            if os.path.isfile(test_path):
+                return test_path
+
+        return ''
+
+    def _get_compile_key(self, pex_name: str, script_path: str, import_paths: list) -> str:
+        """
+        Returns hash of every input that affects the compiled script
+
+        Only file contents and options are hashed, not absolute paths, so that the key is the
+        same in every checkout of the project and can be used to share compiled scripts.
+        """
+        return BuildManifest.create_key(script=pex_name.replace(os.sep, '/').casefold(),
+                                        game=self.options.game_type.name,
+                                        source=self.build_manifest.hash_file(script_path),
+                                        dependencies=self._get_dependency_hash(script_path),
+                                        flags=self.build_manifest.hash_file(self._find_flags_path(import_paths)),
+                                        compiler=self.build_manifest.hash_file(self.options.compiler_path),
+                                        optimize=self.optimize,
+                                        release=self.release,
+                                        final=self.final,
+                                        anonymize=self._get_anonymize_mode(),
+                                        reproducible=self.options.reproducible)
+
+    def _get_anonymize_mode(self) -> str:
+        """Returns how compiled scripts are anonymized, so that changing it recompiles scripts anonymized otherwise"""
+        if not self.options.anonymize:
+            return ''
+        return 'deterministic' if self.options.deterministic_anonymize else 'random'
+
+    def _get_dependency_hash(self, script_path: str) -> str:
+        """Returns hash of the sources of every script that script depends on, including imported scripts"""
+        return self.dependency_hashes.get(self.dependency_graph.get_key(script_path), '')
+
+    def _find_missing_script_paths(self) -> dict:
+        """Returns list of script paths for compiled scripts that do not exist"""
+        return {entry.object_name: entry.psc_path for entry in self.script_index if not entry.has_pex}
 
     def _get_import_paths(self) -> list:
         """Returns absolute import paths from Papyrus Project"""
@@ -412,20 +551,16 @@ class PapyrusProject(ProjectBase):
 
         return PathHelper.uniqify(implicit_paths)
 
-    def _get_pex_paths(self) -> list:
+    def _get_script_index(self) -> ScriptIndex:
         """
-        Returns absolute paths to compiled scripts that may not exist yet in output folder
+        Returns index of scripts and the compiled scripts that may not exist yet in output folder
         """
-        pex_paths: list = []
+        script_index = ScriptIndex(self.options.output_path, namespaced=self.options.game_type == GameType.FO4)
 
         for object_name, script_path in self.psc_paths.items():
-            pex_path = os.path.join(self.options.output_path, object_name.replace('.psc', '.pex'))
-
-            # do not check if file exists, we do that in _find_missing_script_paths for a different reason
-            if pex_path not in pex_paths:
-                pex_paths.append(pex_path)
+            script_index.add(object_name, script_path)
 
-        return pex_paths
+        return script_index
 
     def _get_psc_paths(self) -> dict:
         """Returns script paths from Folders and Scripts nodes"""
@@ -501,7 +636,7 @@ class PapyrusProject(ProjectBase):
 
             # try to add project path
             if folder_node.text == os.curdir:
-                yield from PathHelper.find_script_paths_from_folder(self.project_path, no_recurse)
+                yield from self.file_index.find_files(self.project_path, recursive=not no_recurse, extension='.psc')
                 continue
 
             if startswith(folder_node.text, self.remote_schemas, ignorecase=True):
@@ -509,27 +644,27 @@ class PapyrusProject(ProjectBase):
                 PapyrusProject.log.info(f'Adding import path from remote: "{local_path}"...')
                 self.import_paths.insert(0, local_path)
                 PapyrusProject.log.info(f'Adding folder path from remote: "{local_path}"...')
-                yield from PathHelper.find_script_paths_from_folder(local_path, no_recurse)
+                yield from self.file_index.find_files(local_path, recursive=not no_recurse, extension='.psc')
                 continue
 
             folder_path: str = os.path.normpath(folder_node.text)
 
             # try to add absolute path
             if os.path.isabs(folder_path) and os.path.isdir(folder_path):
-                yield from PathHelper.find_script_paths_from_folder(folder_path, no_recurse)
+                yield from self.file_index.find_files(folder_path, recursive=not no_recurse, extension='.psc')
                 continue
 
             # try to add project-relative folder path
             test_path = os.path.join(self.project_path, folder_path)
             if os.path.isdir(test_path):
-                yield from PathHelper.find_script_paths_from_folder(test_path, no_recurse)
+                yield from self.file_index.find_files(test_path, recursive=not no_recurse, extension='.psc')
                 continue
 
             # try to add import-relative folder path
             for import_path in self.import_paths:
                 test_path = os.path.join(import_path, folder_path)
                 if os.path.isdir(test_path):
-                    yield from PathHelper.find_script_paths_from_folder(test_path, no_recurse)
+                    yield from self.file_index.find_files(test_path, recursive=not no_recurse, extension='.psc')
 
     def _get_script_paths_from_scripts_node(self) -> typing.Generator:
         """Returns script paths from the Scripts node"""
@@ -539,96 +674,123 @@ class PapyrusProject(ProjectBase):
 
             yield os.path.normpath(script_node.text)
 
-    def _try_exclude_unmodified_scripts(self) -> dict:
-        psc_paths: dict = {}
+    def build_dependency_graph(self) -> DependencyGraph:
+        """
+        Scans project scripts and the imported scripts they depend on
+        """
+        graph = DependencyGraph(self.import_paths, self.file_index)
+        graph.add_scripts(entry.psc_path for entry in self.script_index)
 
-        for object_name, script_path in self.psc_paths.items():
-            script_name, _ = os.path.splitext(os.path.basename(script_path))
+        PapyrusProject.log.info(f'{len(graph.nodes)} scripts scanned for dependencies.')
 
-            # if pex exists, compare time_t in pex header with psc's last modified timestamp
-            matching_path: str = ''
-            for pex_path in self.pex_paths:
-                if pex_path.endswith(f'{script_name}.pex'):
-                    matching_path = pex_path
-                    break
+        self.file_index.save_journal()
 
-            if not os.path.isfile(matching_path):
-                continue
+        return graph
 
-            try:
-                header = PexReader.get_header(matching_path)
-            except ValueError:
-                PapyrusProject.log.warning(f'Cannot determine compilation time due to unknown magic: "{matching_path}"')
-                continue
+    def refresh(self, changed_paths: list) -> None:
+        """Forgets cached hashes and script dependencies of modified files so that the next build sees their changes"""
+        if self.build_manifest is not None:
+            self.build_manifest.invalidate(changed_paths)
 
-            compiled_time: int = header.compilation_time.value
-            if os.path.getmtime(script_path) < compiled_time:
-                continue
+        script_paths: list = [path for path in changed_paths if endswith(path, '.psc', ignorecase=True)]
+
+        if self.dependency_graph is not None and not self.dependency_graph.update_scripts(script_paths):
+            self.dependency_graph = None
+
+    def _build_command(self, target: str, import_paths: list, *, batch: bool = False) -> list:
+        """
+        Builds command arguments for compiling a script or, when batch is True, every script in a folder
+        """
+        arguments = CommandArguments()
+
+        arguments.append(self.options.compiler_path, enquote_value=True)
+        arguments.append(target, enquote_value=True)
+        arguments.append(self.options.flags_path, key='f', enquote_value=True)
+        arguments.append(';'.join(import_paths), key='i', enquote_value=True)
+        arguments.append(self.options.output_path, key='o', enquote_value=True)
+
+        if self.options.game_type == GameType.FO4:
+            if self.release:
+                arguments.append('-release')
+
+            if self.final:
+                arguments.append('-final')
+
+        if self.optimize:
+            arguments.append('-op')
 
-            if script_path not in psc_paths:
-                psc_paths[object_name] = script_path
+        if batch:
+            arguments.append('-all')
 
-        return psc_paths
+        return arguments.split()
 
-    def build_commands(self) -> list:
+    def build_batch_command(self, folder_path: str, import_paths: list) -> list:
         """
-        Builds list of commands for compiling scripts
+        Builds command for compiling every script in folder with a single compiler process
         """
-        commands: list = []
+        return self._build_command(folder_path, import_paths, batch=True)
 
-        arguments = CommandArguments()
+    def build_commands(self) -> dict:
+        """
+        Builds command arguments for compiling scripts, keyed by script path
+        """
+        commands: dict = {}
 
-        compiler_path: str = self.options.compiler_path
-        flags_path: str = self.options.flags_path
         output_path: str = self.options.output_path
 
-        if self.options.no_incremental_build:
-            psc_paths: dict = self.psc_paths
-        else:
-            psc_paths = self._try_exclude_unmodified_scripts()
+        if self.build_manifest is None:
+            self.build_manifest = BuildManifest(self.get_manifest_path())
+
+        if self.dependency_graph is None:
+            self.dependency_graph = self.build_dependency_graph()
 
-        # add .psc scripts whose .pex counterparts do not exist
-        for object_name, script_path in self.missing_scripts.items():
-            if object_name not in psc_paths.keys():
-                psc_paths[object_name] = script_path
+        self.dependency_hashes = self.dependency_graph.get_closure_hashes(self.build_manifest.hash_file)
 
-        source_import_paths = deepcopy(self.import_paths)
+        self.compile_keys = {}
+        self.compile_import_paths = {}
 
-        # TODO: depth sorting solution is not foolproof! parse psc files for imports to determine command order
-        for object_name, script_path in psc_paths.items():
-            import_paths: list = self.import_paths
+        # scripts whose own source is unchanged but which depend on a changed script
+        invalidated_count: int = 0
+
+        self.script_import_roots = self.dependency_graph.get_import_roots()
+        self.flags_import_path = self._find_flags_import_path()
+
+        # commands are ordered by BuildFacade using the dependency graph
+        for script in self.script_index:
+            object_name, script_path, pex_path = script.object_name, script.psc_path, script.pex_path
+
+            import_paths: list = self._get_script_import_paths(object_name, script_path)
 
             if self.options.game_type != GameType.FO4:
                 object_name = script_path
 
-            # remove unnecessary import paths for script
-            if self.options.game_type == GameType.FO4:
-                for import_path in reversed(self.import_paths):
-                    if self._can_remove_folder(import_path, object_name, script_path):
-                        import_paths.remove(import_path)
+            compile_key: str = self._get_compile_key(os.path.relpath(pex_path, output_path), script_path, import_paths)
+
+            # skip scripts whose inputs, including the scripts they depend on, have not changed
+            if not self.options.no_incremental_build:
+                if self.build_manifest.is_current(script_path, compile_key, pex_path):
+                    continue
 
-            arguments.clear()
-            arguments.append(compiler_path, enquote_value=True)
-            arguments.append(object_name, enquote_value=True)
-            arguments.append(flags_path, key='f', enquote_value=True)
-            arguments.append(';'.join(import_paths), key='i', enquote_value=True)
-            arguments.append(output_path, key='o', enquote_value=True)
+            # the compiled script will be rewritten or restored from cache
+            script.forget_pex()
 
-            if self.options.game_type == GameType.FO4:
-                # noinspection PyUnboundLocalVariable
-                if self.release:
-                    arguments.append('-release')
+            entry: dict = {
+                'key': compile_key,
+                'pex': pex_path,
+                'source': self.build_manifest.hash_file(script_path),
+                'dependencies': self._get_dependency_hash(script_path)
+            }
 
-                # noinspection PyUnboundLocalVariable
-                if self.final:
-                    arguments.append('-final')
+            previous_entry: dict = self.build_manifest.get(script_path)
+            if previous_entry.get('source') == entry['source'] and previous_entry.get('dependencies') != entry['dependencies']:
+                invalidated_count += 1
 
-            if self.optimize:
-                arguments.append('-op')
+            self.compile_keys[script_path] = entry
+            self.compile_import_paths[script_path] = import_paths
 
-            arg_s = arguments.join()
-            commands.append(arg_s)
+            commands[script_path] = self._build_command(object_name, import_paths)
 
-        self.import_paths = source_import_paths
+        if invalidated_count > 0:
+            PapyrusProject.log.info(f'{invalidated_count} unmodified scripts will be compiled because scripts they depend on were modified.')
 
         return commands
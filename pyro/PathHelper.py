@@ -1,7 +1,7 @@
-import glob
 import os
+import shutil
 from collections import OrderedDict
-from typing import Generator, Iterable
+from typing import Iterable
 from urllib.parse import unquote_plus, urlparse
 
 from pyro.Comparators import endswith, startswith
@@ -30,19 +30,29 @@ class PathHelper:
         return file_name
 
     @staticmethod
-    def find_include_paths(search_path: str, no_recurse: bool) -> Generator:
-        """Yields existing file paths from absolute search path"""
-        for include_path in glob.iglob(search_path, recursive=not no_recurse):
-            if os.path.isfile(include_path):
-                yield include_path
+    def link_or_copy(source_path: str, target_path: str, *, symlink: bool = False) -> None:
+        """
+        Creates hard link to source file at target path, or copies the file if it cannot be linked
 
-    @staticmethod
-    def find_script_paths_from_folder(folder_path: str, no_recurse: bool) -> Generator:
-        """Yields existing script paths starting from absolute folder path"""
-        search_path: str = os.path.join(folder_path, '*' if no_recurse else r'**\*')
-        for script_path in glob.iglob(search_path, recursive=not no_recurse):
-            if os.path.isfile(script_path) and endswith(script_path, '.psc', ignorecase=True):
-                yield script_path
+        When symlink is True, files that cannot be hard linked, such as files on other devices,
+        are symbolically linked if the platform allows it before falling back to copying.
+        """
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+
+        try:
+            os.link(source_path, target_path)
+            return
+        except OSError:
+            pass
+
+        if symlink:
+            try:
+                os.symlink(os.path.abspath(source_path), target_path)
+                return
+            except (OSError, NotImplementedError):
+                pass
+
+        shutil.copy2(source_path, target_path)
 
     @staticmethod
     def uniqify(items: Iterable) -> list:
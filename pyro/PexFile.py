@@ -0,0 +1,538 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pyro.Enums.PexOpcode import PexOpcode
+from pyro.PexHeader import PexHeader
+from pyro.PexReader import Buffer, PexReader
+from pyro.PexTypes import (PexDebugFunction,
+                           PexDebugInfo,
+                           PexFunction,
+                           PexInstruction,
+                           PexObject,
+                           PexProperty,
+                           PexPropertyGroup,
+                           PexState,
+                           PexStruct,
+                           PexStructOrder,
+                           PexUserFlag,
+                           PexValue,
+                           PexVariable)
+
+
+class PexStringTable:
+    """
+    String table that keeps offsets and lengths in arrays and decodes strings when they are first used
+    """
+    __slots__ = ('_data', '_offsets', '_lengths', '_strings')
+
+    encoding: str = 'cp1252'
+
+    def __init__(self, data: Buffer, offsets: array, lengths: array) -> None:
+        self._data = data
+        self._offsets = offsets
+        self._lengths = lengths
+        self._strings: Dict[int, str] = {}
+
+    def __getitem__(self, index: int) -> str:
+        string = self._strings.get(index)
+
+        if string is None:
+            offset = self._offsets[index]
+            string = str(self._data[offset:offset + self._lengths[index]], self.encoding, 'replace')
+            self._strings[index] = string
+
+        return string
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+
+class PexFile:
+    """
+    Reader for compiled Skyrim and Fallout 4 scripts
+
+    The file is memory-mapped. Opening a file locates every section by reading
+    only lengths and counts; the debug info and objects are decoded when first used.
+    """
+
+    # number of fixed arguments, and whether a variable number of arguments follows
+    opcode_arguments: Dict[PexOpcode, Tuple[int, bool]] = {
+        PexOpcode.NOP: (0, False),
+        PexOpcode.IADD: (3, False),
+        PexOpcode.FADD: (3, False),
+        PexOpcode.ISUB: (3, False),
+        PexOpcode.FSUB: (3, False),
+        PexOpcode.IMUL: (3, False),
+        PexOpcode.FMUL: (3, False),
+        PexOpcode.IDIV: (3, False),
+        PexOpcode.FDIV: (3, False),
+        PexOpcode.IMOD: (3, False),
+        PexOpcode.NOT: (2, False),
+        PexOpcode.INEG: (2, False),
+        PexOpcode.FNEG: (2, False),
+        PexOpcode.ASSIGN: (2, False),
+        PexOpcode.CAST: (2, False),
+        PexOpcode.CMP_EQ: (3, False),
+        PexOpcode.CMP_LT: (3, False),
+        PexOpcode.CMP_LTE: (3, False),
+        PexOpcode.CMP_GT: (3, False),
+        PexOpcode.CMP_GTE: (3, False),
+        PexOpcode.JMP: (1, False),
+        PexOpcode.JMPT: (2, False),
+        PexOpcode.JMPF: (2, False),
+        PexOpcode.CALLMETHOD: (3, True),
+        PexOpcode.CALLPARENT: (2, True),
+        PexOpcode.CALLSTATIC: (3, True),
+        PexOpcode.RETURN: (1, False),
+        PexOpcode.STRCAT: (3, False),
+        PexOpcode.PROPGET: (3, False),
+        PexOpcode.PROPSET: (3, False),
+        PexOpcode.ARRAY_CREATE: (2, False),
+        PexOpcode.ARRAY_LENGTH: (2, False),
+        PexOpcode.ARRAY_GETELEMENT: (3, False),
+        PexOpcode.ARRAY_SETELEMENT: (3, False),
+        PexOpcode.ARRAY_FINDELEMENT: (4, False),
+        PexOpcode.ARRAY_RFINDELEMENT: (4, False),
+        PexOpcode.IS: (3, False),
+        PexOpcode.STRUCT_CREATE: (1, False),
+        PexOpcode.STRUCT_GET: (3, False),
+        PexOpcode.STRUCT_SET: (3, False),
+        PexOpcode.ARRAY_FINDSTRUCT: (5, False),
+        PexOpcode.ARRAY_RFINDSTRUCT: (5, False),
+        PexOpcode.ARRAY_ADD: (3, False),
+        PexOpcode.ARRAY_INSERT: (3, False),
+        PexOpcode.ARRAY_REMOVELAST: (1, False),
+        PexOpcode.ARRAY_REMOVE: (3, False),
+        PexOpcode.ARRAY_CLEAR: (1, False),
+    }
+
+    def __init__(self, data: Buffer, path: str = '') -> None:
+        self.path: str = path
+        self._data: Buffer = data
+        self._mmap: Optional[mmap.mmap] = None
+
+        try:
+            self.header: PexHeader = PexReader.decode_header(data, path)
+        except EOFError as e:
+            raise ValueError(str(e))
+
+        # Fallout 4 scripts are little-endian and have additional fields
+        self.is_fallout4: bool = self.header.endianness == 'little'
+
+        byte_order: str = '<' if self.is_fallout4 else '>'
+        self._u8: Callable = struct.Struct(f'{byte_order}B').unpack_from
+        self._u16: Callable = struct.Struct(f'{byte_order}H').unpack_from
+        self._u32: Callable = struct.Struct(f'{byte_order}I').unpack_from
+        self._u64: Callable = struct.Struct(f'{byte_order}Q').unpack_from
+        self._i32: Callable = struct.Struct(f'{byte_order}i').unpack_from
+        self._f32: Callable = struct.Struct(f'{byte_order}f').unpack_from
+
+        # arrays are read in native byte order
+        self._swap_arrays: bool = sys.byteorder != self.header.endianness
+
+        self._debug_info: Optional[PexDebugInfo] = None
+        self._objects: Optional[List[PexObject]] = None
+
+        try:
+            self._index()
+        except struct.error as e:
+            raise ValueError(f'Cannot read truncated or invalid file: "{path}" ({e})')
+
+    @staticmethod
+    def open(path: str) -> 'PexFile':
+        """Returns reader for memory-mapped file, which should be closed after use"""
+        with open(path, mode='rb') as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty files cannot be mapped
+                data = f.read()
+
+        try:
+            pex_file = PexFile(data, path)
+        except Exception:
+            if isinstance(data, mmap.mmap):
+                data.close()
+            raise
+
+        if isinstance(data, mmap.mmap):
+            pex_file._mmap = data
+
+        return pex_file
+
+    def close(self) -> None:
+        """Unmaps file, after which sections that have not been decoded cannot be read"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> 'PexFile':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    @staticmethod
+    def _to_json(value: object) -> object:
+        if isinstance(value, PexOpcode):
+            return value.name
+        if isinstance(value, PexValue):
+            return value.value
+        if isinstance(value, tuple) and hasattr(value, '_asdict'):
+            return {key: PexFile._to_json(item) for key, item in value._asdict().items()}
+        if isinstance(value, (list, tuple, array)):
+            return [PexFile._to_json(item) for item in value]
+        return value
+
+    @staticmethod
+    def dump(path: str) -> str:
+        """Returns JSON representation of header, user flags, debug info, and objects"""
+        data: dict = json.loads(PexReader.dump(path))
+
+        with PexFile.open(path) as pex_file:
+            data['user_flags'] = PexFile._to_json(pex_file.user_flags)
+            data['debug_info'] = PexFile._to_json(pex_file.debug_info)
+            data['objects'] = PexFile._to_json(pex_file.objects)
+
+        return json.dumps(data, indent=4)
+
+    def _index(self) -> None:
+        """Locates sections by reading only lengths and counts"""
+        offset: int = self.header.size
+
+        # string table
+        count, = self._u16(self._data, offset)
+        offset += 2
+
+        offsets = array('I')
+        lengths = array('H')
+
+        for _ in range(count):
+            length, = self._u16(self._data, offset)
+            offsets.append(offset + 2)
+            lengths.append(length)
+            offset += 2 + length
+
+        if offset > len(self._data):
+            raise struct.error('string table exceeds file size')
+
+        self.string_table = PexStringTable(self._data, offsets, lengths)
+
+        # debug info
+        self.debug_info_offset: int = offset
+
+        has_debug_info, = self._u8(self._data, offset)
+        offset += 1
+
+        if has_debug_info:
+            offset += 8
+
+            count, = self._u16(self._data, offset)
+            offset += 2
+            for _ in range(count):
+                instruction_count, = self._u16(self._data, offset + 7)
+                offset += 9 + 2 * instruction_count
+
+            if self.is_fallout4:
+                count, = self._u16(self._data, offset)
+                offset += 2
+                for _ in range(count):
+                    name_count, = self._u16(self._data, offset + 10)
+                    offset += 12 + 2 * name_count
+
+                count, = self._u16(self._data, offset)
+                offset += 2
+                for _ in range(count):
+                    name_count, = self._u16(self._data, offset + 4)
+                    offset += 6 + 2 * name_count
+
+        # user flags
+        count, = self._u16(self._data, offset)
+        offset += 2
+
+        self.user_flags: List[PexUserFlag] = []
+        for _ in range(count):
+            name_index, = self._u16(self._data, offset)
+            flag_index, = self._u8(self._data, offset + 2)
+            self.user_flags.append(PexUserFlag(self.string_table[name_index], flag_index))
+            offset += 3
+
+        # objects, which are skipped using their sizes
+        count, = self._u16(self._data, offset)
+        offset += 2
+
+        self.object_names: List[str] = []
+        self._object_offsets: List[int] = []
+
+        for _ in range(count):
+            name_index, = self._u16(self._data, offset)
+            size, = self._u32(self._data, offset + 2)
+
+            # object size includes the size field itself
+            self.object_names.append(self.string_table[name_index])
+            self._object_offsets.append(offset + 6)
+            offset += 2 + size
+
+        if offset > len(self._data):
+            raise struct.error('objects exceed file size')
+
+    def _read_u16_array(self, offset: int, count: int) -> array:
+        values = array('H')
+        values.frombytes(self._data[offset:offset + 2 * count])
+        if self._swap_arrays:
+            values.byteswap()
+        return values
+
+    @property
+    def debug_info(self) -> Optional[PexDebugInfo]:
+        """Returns debug info, or None if script was compiled without debug info"""
+        if self._debug_info is None:
+            self._debug_info = self._read_debug_info(self.debug_info_offset)
+        return self._debug_info if self._debug_info.modification_time >= 0 else None
+
+    def _read_debug_info(self, offset: int) -> PexDebugInfo:
+        strings = self.string_table
+
+        has_debug_info, = self._u8(self._data, offset)
+        offset += 1
+
+        if not has_debug_info:
+            return PexDebugInfo(-1, [], [], [])
+
+        modification_time, = self._u64(self._data, offset)
+        offset += 8
+
+        functions: List[PexDebugFunction] = []
+
+        count, = self._u16(self._data, offset)
+        offset += 2
+        for _ in range(count):
+            object_name, = self._u16(self._data, offset)
+            state_name, = self._u16(self._data, offset + 2)
+            function_name, = self._u16(self._data, offset + 4)
+            function_type, = self._u8(self._data, offset + 6)
+            instruction_count, = self._u16(self._data, offset + 7)
+            offset += 9
+
+            functions.append(PexDebugFunction(strings[object_name], strings[state_name], strings[function_name],
+                                              function_type, self._read_u16_array(offset, instruction_count)))
+            offset += 2 * instruction_count
+
+        property_groups: List[PexPropertyGroup] = []
+        struct_orders: List[PexStructOrder] = []
+
+        if self.is_fallout4:
+            count, = self._u16(self._data, offset)
+            offset += 2
+            for _ in range(count):
+                object_name, = self._u16(self._data, offset)
+                group_name, = self._u16(self._data, offset + 2)
+                doc_string, = self._u16(self._data, offset + 4)
+                user_flags, = self._u32(self._data, offset + 6)
+                name_count, = self._u16(self._data, offset + 10)
+                offset += 12
+
+                names = [strings[i] for i in self._read_u16_array(offset, name_count)]
+                property_groups.append(PexPropertyGroup(strings[object_name], strings[group_name],
+                                                        strings[doc_string], user_flags, names))
+                offset += 2 * name_count
+
+            count, = self._u16(self._data, offset)
+            offset += 2
+            for _ in range(count):
+                object_name, = self._u16(self._data, offset)
+                order_name, = self._u16(self._data, offset + 2)
+                name_count, = self._u16(self._data, offset + 4)
+                offset += 6
+
+                names = [strings[i] for i in self._read_u16_array(offset, name_count)]
+                struct_orders.append(PexStructOrder(strings[object_name], strings[order_name], names))
+                offset += 2 * name_count
+
+        return PexDebugInfo(modification_time, functions, property_groups, struct_orders)
+
+    @property
+    def objects(self) -> List[PexObject]:
+        if self._objects is None:
+            self._objects = [self._read_object(name, offset) for name, offset in zip(self.object_names, self._object_offsets)]
+        return self._objects
+
+    def _read_string(self, offset: int) -> Tuple[str, int]:
+        index, = self._u16(self._data, offset)
+        return self.string_table[index], offset + 2
+
+    def _read_value(self, offset: int) -> Tuple[PexValue, int]:
+        value_type, = self._u8(self._data, offset)
+        offset += 1
+
+        if value_type == 0:
+            return PexValue(0, None), offset
+        if value_type in (1, 2):
+            index, = self._u16(self._data, offset)
+            return PexValue(value_type, self.string_table[index]), offset + 2
+        if value_type == 3:
+            value, = self._i32(self._data, offset)
+            return PexValue(3, value), offset + 4
+        if value_type == 4:
+            value, = self._f32(self._data, offset)
+            return PexValue(4, value), offset + 4
+        if value_type == 5:
+            value, = self._u8(self._data, offset)
+            return PexValue(5, bool(value)), offset + 1
+
+        raise ValueError(f'Cannot read value of unknown type {value_type} at offset {offset - 1} in "{self.path}"')
+
+    def _read_variable(self, offset: int, *, is_struct_member: bool = False) -> Tuple[PexVariable, int]:
+        name, offset = self._read_string(offset)
+        type_name, offset = self._read_string(offset)
+        user_flags, = self._u32(self._data, offset)
+        value, offset = self._read_value(offset + 4)
+
+        is_const: bool = False
+        doc_string: str = ''
+
+        if self.is_fallout4:
+            is_const = bool(self._u8(self._data, offset)[0])
+            offset += 1
+
+            if is_struct_member:
+                doc_string, offset = self._read_string(offset)
+
+        return PexVariable(name, type_name, user_flags, value, is_const, doc_string), offset
+
+    def _read_names(self, offset: int) -> Tuple[List[Tuple[str, str]], int]:
+        """Reads parameters or locals, which are pairs of names and type names"""
+        count, = self._u16(self._data, offset)
+        offset += 2
+
+        names = [(self.string_table[name], self.string_table[type_name])
+                 for name, type_name in zip(*[iter(self._read_u16_array(offset, 2 * count))] * 2)]
+
+        return names, offset + 4 * count
+
+    def _read_function(self, name: str, offset: int) -> Tuple[PexFunction, int]:
+        return_type, offset = self._read_string(offset)
+        doc_string, offset = self._read_string(offset)
+        user_flags, = self._u32(self._data, offset)
+        flags, = self._u8(self._data, offset + 4)
+        offset += 5
+
+        parameters, offset = self._read_names(offset)
+        local_names, offset = self._read_names(offset)
+
+        count, = self._u16(self._data, offset)
+        offset += 2
+
+        instructions: List[PexInstruction] = []
+
+        for _ in range(count):
+            code, = self._u8(self._data, offset)
+            offset += 1
+
+            try:
+                opcode = PexOpcode(code)
+            except ValueError:
+                raise ValueError(f'Cannot read instruction with unknown opcode {code} at offset {offset - 1} in "{self.path}"')
+
+            argument_count, has_variable_arguments = self.opcode_arguments[opcode]
+
+            arguments: List[PexValue] = []
+            for _ in range(argument_count):
+                value, offset = self._read_value(offset)
+                arguments.append(value)
+
+            if has_variable_arguments:
+                value, offset = self._read_value(offset)
+                arguments.append(value)
+                for _ in range(value.value):
+                    value, offset = self._read_value(offset)
+                    arguments.append(value)
+
+            instructions.append(PexInstruction(opcode, arguments))
+
+        return PexFunction(name, return_type, doc_string, user_flags, flags, parameters, local_names, instructions), offset
+
+    def _read_object(self, name: str, offset: int) -> PexObject:
+        parent_class_name, offset = self._read_string(offset)
+        doc_string, offset = self._read_string(offset)
+
+        is_const: bool = False
+        if self.is_fallout4:
+            is_const = bool(self._u8(self._data, offset)[0])
+            offset += 1
+
+        user_flags, = self._u32(self._data, offset)
+        auto_state_name, offset = self._read_string(offset + 4)
+
+        structs: List[PexStruct] = []
+        if self.is_fallout4:
+            count, = self._u16(self._data, offset)
+            offset += 2
+            for _ in range(count):
+                struct_name, offset = self._read_string(offset)
+                member_count, = self._u16(self._data, offset)
+                offset += 2
+
+                members: List[PexVariable] = []
+                for _ in range(member_count):
+                    member, offset = self._read_variable(offset, is_struct_member=True)
+                    members.append(member)
+
+                structs.append(PexStruct(struct_name, members))
+
+        variables: List[PexVariable] = []
+        count, = self._u16(self._data, offset)
+        offset += 2
+        for _ in range(count):
+            variable, offset = self._read_variable(offset)
+            variables.append(variable)
+
+        properties: List[PexProperty] = []
+        count, = self._u16(self._data, offset)
+        offset += 2
+        for _ in range(count):
+            property_name, offset = self._read_string(offset)
+            type_name, offset = self._read_string(offset)
+            property_doc_string, offset = self._read_string(offset)
+            property_user_flags, = self._u32(self._data, offset)
+            flags, = self._u8(self._data, offset + 4)
+            offset += 5
+
+            auto_var_name: str = ''
+            read_handler: Optional[PexFunction] = None
+            write_handler: Optional[PexFunction] = None
+
+            # 1 = read, 2 = write, 4 = auto: auto properties have no handlers
+            if flags & 4:
+                auto_var_name, offset = self._read_string(offset)
+            else:
+                if flags & 1:
+                    read_handler, offset = self._read_function('', offset)
+                if flags & 2:
+                    write_handler, offset = self._read_function('', offset)
+
+            properties.append(PexProperty(property_name, type_name, property_doc_string, property_user_flags,
+                                          flags, auto_var_name, read_handler, write_handler))
+
+        states: List[PexState] = []
+        count, = self._u16(self._data, offset)
+        offset += 2
+        for _ in range(count):
+            state_name, offset = self._read_string(offset)
+            function_count, = self._u16(self._data, offset)
+            offset += 2
+
+            functions: List[PexFunction] = []
+            for _ in range(function_count):
+                function_name, offset = self._read_string(offset)
+                function, offset = self._read_function(function_name, offset)
+                functions.append(function)
+
+            states.append(PexState(state_name, functions))
+
+        return PexObject(name, parent_class_name, doc_string, is_const, user_flags, auto_state_name,
+                         structs, variables, properties, states)
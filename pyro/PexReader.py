@@ -1,51 +1,116 @@
 import binascii
 import json
-import os
+import struct
+from typing import IO, Union
 
 from pyro.PexHeader import PexHeader
-from pyro.PexTypes import PexInt, PexStr
+from pyro.PexTypes import PexData, PexInt, PexStr
+
+
+Buffer = Union[bytes, bytearray, memoryview]
 
 
 class PexReader:
+    """
+    Reads headers of compiled scripts with one read call and struct formats
+
+    Headers are not cached between calls. The build decides which scripts are current from build
+    manifest keys, and the anonymizer decodes headers from data it has already read, so a build
+    reads each header at most once.
+    """
+    # headers are usually much smaller than this, so most headers are read in one call
+    prefix_size: int = 4096
+
+    # header fields in file order: integer fields have struct formats, string fields are sized by the preceding field
+    fields: tuple = (
+        ('major_version', 'B'),
+        ('minor_version', 'B'),
+        ('game_id', 'H'),
+        ('compilation_time', 'Q'),
+        ('script_path_size', 'H'),
+        ('script_path', None),
+        ('user_name_size', 'H'),
+        ('user_name', None),
+        ('computer_name_size', 'H'),
+        ('computer_name', None),
+    )
+
     @staticmethod
-    def get_header(path: str) -> PexHeader:
+    def decode_header(data: Buffer, path: str = '') -> PexHeader:
+        """Decodes header from bytes-like object, and raises EOFError if the header does not fit in the data"""
         header = PexHeader()
 
-        with open(path, mode='rb') as f:
-            f.seek(0, os.SEEK_SET)
-
-            header.read(f, 'magic', 4)
-
-            if header.magic.value == 0xFA57C0DE:  # Fallout 4
-                header.endianness = 'little'
-            elif header.magic.value == 0xDEC057FA:  # Skyrim LE/SE
-                header.endianness = 'big'
-            else:
-                raise ValueError(f'Cannot determine endianness from file magic in "{path}"')
-
-            header.read(f, 'major_version', 1)
-            header.read(f, 'minor_version', 1)
-            header.read(f, 'game_id', 2)
-            header.read(f, 'compilation_time', 8)
-            header.read(f, 'script_path_size', 2)
-            header.read(f, 'script_path', header.script_path_size.value)
-            header.read(f, 'user_name_size', 2)
-            header.read(f, 'user_name', header.user_name_size.value)
-            header.read(f, 'computer_name_size', 2)
-            header.read(f, 'computer_name', header.computer_name_size.value)
-            header.size = f.tell()
+        if len(data) < 4:
+            raise ValueError(f'Cannot determine endianness from file magic in "{path}"')
+
+        header.magic = PexInt(0, bytes(data[:4]), int.from_bytes(data[:4], 'little'))
+
+        if header.magic.value == 0xFA57C0DE:  # Fallout 4
+            header.endianness, byte_order = 'little', '<'
+        elif header.magic.value == 0xDEC057FA:  # Skyrim LE/SE
+            header.endianness, byte_order = 'big', '>'
+        else:
+            raise ValueError(f'Cannot determine endianness from file magic in "{path}"')
+
+        offset: int = 4
+
+        # the view is released on return, so that memory-mapped data can be closed
+        with memoryview(data) as view:
+            for name, field_format in PexReader.fields:
+                if field_format is None:
+                    length: int = getattr(header, f'{name}_size').value
+                else:
+                    length = struct.calcsize(field_format)
+
+                if offset + length > len(data):
+                    raise EOFError(f'Cannot read header from truncated file: "{path}"')
+
+                field_data: bytes = view[offset:offset + length].tobytes()
+
+                if field_format is None:
+                    setattr(header, name, PexStr(offset, field_data, field_data.decode('ascii')))
+                else:
+                    value: int = struct.unpack_from(f'{byte_order}{field_format}', view, offset)[0]
+                    setattr(header, name, PexInt(offset, field_data, value))
+
+                offset += length
+
+        header.size = offset
 
         return header
 
+    @staticmethod
+    def _read_header(path: str, f: IO) -> PexHeader:
+        data: bytes = f.read(PexReader.prefix_size)
+
+        try:
+            return PexReader.decode_header(data, path)
+        except EOFError:
+            pass
+
+        # read the rest of the file only if the header strings do not fit in the prefix
+        data += f.read()
+
+        try:
+            return PexReader.decode_header(data, path)
+        except EOFError as e:
+            raise ValueError(str(e))
+
+    @staticmethod
+    def get_header(path: str) -> PexHeader:
+        """Returns header of compiled script"""
+        with open(path, mode='rb') as f:
+            return PexReader._read_header(path, f)
+
     @staticmethod
     def dump(file_path: str) -> str:
-        header = PexReader.get_header(file_path).__dict__
+        header = PexReader.get_header(file_path).__dict__.copy()
 
         for key, value in header.items():
             if not isinstance(value, (PexInt, PexStr)):
                 continue
 
-            header[key] = value.__dict__
+            header[key] = {k: getattr(value, k) for k in PexData.__slots__}
 
             for k, v in header[key].items():
                 if not isinstance(v, bytes):
@@ -1,12 +1,128 @@
+from array import array
+from typing import List, NamedTuple, Optional, Tuple
+
+from pyro.Enums.PexOpcode import PexOpcode
+
+
 class PexData:
+    __slots__ = ('offset', 'data', 'value')
+
     offset: int
     data: bytes
     value: object
 
+    def __init__(self, offset: int = 0, data: bytes = b'', value: object = None) -> None:
+        self.offset = offset
+        self.data = data
+        self.value = value
+
 
 class PexInt(PexData):
+    __slots__ = ()
+
     value: int
 
 
 class PexStr(PexData):
+    __slots__ = ()
+
     value: str
+
+
+class PexValue(NamedTuple):
+    # 0 = none, 1 = identifier, 2 = string, 3 = integer, 4 = float, 5 = bool
+    type: int
+    value: object
+
+
+class PexUserFlag(NamedTuple):
+    name: str
+    flag_index: int
+
+
+class PexDebugFunction(NamedTuple):
+    object_name: str
+    state_name: str
+    function_name: str
+    function_type: int
+    line_numbers: array
+
+
+class PexPropertyGroup(NamedTuple):
+    object_name: str
+    group_name: str
+    doc_string: str
+    user_flags: int
+    property_names: List[str]
+
+
+class PexStructOrder(NamedTuple):
+    object_name: str
+    order_name: str
+    names: List[str]
+
+
+class PexDebugInfo(NamedTuple):
+    modification_time: int
+    functions: List[PexDebugFunction]
+    property_groups: List[PexPropertyGroup]
+    struct_orders: List[PexStructOrder]
+
+
+class PexInstruction(NamedTuple):
+    opcode: PexOpcode
+    arguments: List[PexValue]
+
+
+class PexFunction(NamedTuple):
+    name: str
+    return_type: str
+    doc_string: str
+    user_flags: int
+    flags: int
+    parameters: List[Tuple[str, str]]
+    locals: List[Tuple[str, str]]
+    instructions: List[PexInstruction]
+
+
+class PexState(NamedTuple):
+    name: str
+    functions: List[PexFunction]
+
+
+class PexVariable(NamedTuple):
+    name: str
+    type_name: str
+    user_flags: int
+    value: PexValue
+    is_const: bool
+    doc_string: str
+
+
+class PexStruct(NamedTuple):
+    name: str
+    members: List[PexVariable]
+
+
+class PexProperty(NamedTuple):
+    name: str
+    type_name: str
+    doc_string: str
+    user_flags: int
+    flags: int
+    auto_var_name: str
+    read_handler: Optional[PexFunction]
+    write_handler: Optional[PexFunction]
+
+
+class PexObject(NamedTuple):
+    name: str
+    parent_class_name: str
+    doc_string: str
+    is_const: bool
+    user_flags: int
+    auto_state_name: str
+    structs: List[PexStruct]
+    variables: List[PexVariable]
+    properties: List[PexProperty]
+    states: List[PexState]
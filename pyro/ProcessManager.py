@@ -1,15 +1,25 @@
+import asyncio
+import locale
 import logging
 import os
 import re
 import subprocess
+import sys
 from decimal import Decimal
+from typing import Awaitable, Callable, List, Tuple
 
+import psutil
+
+from pyro.CompilerDiagnostic import CompilerDiagnostic
 from pyro.Enums.ProcessState import ProcessState
 
 
 class ProcessManager:
     log: logging.Logger = logging.getLogger('pyro')
 
+    encoding: str = locale.getpreferredencoding(False)
+    chunk_size: int = 1 << 16
+
     @staticmethod
     def _format_time(hours: Decimal, minutes: Decimal, seconds: Decimal) -> str:
         if hours.compare(0) == 1 and minutes.compare(0) == 1 and seconds.compare(0) == 1:
@@ -21,51 +31,92 @@ class ProcessManager:
         return f'{hours}h {minutes}m {seconds}s'
 
     @staticmethod
-    def run_command(command: str, cwd: str, env: dict) -> ProcessState:
-        try:
-            process = subprocess.Popen(command,
-                                       stdout=subprocess.PIPE,
-                                       stderr=subprocess.STDOUT,
-                                       universal_newlines=True,
-                                       shell=True,
-                                       cwd=cwd,
-                                       env=env)
-        except WindowsError as e:
-            ProcessManager.log.error(f'Cannot create process because: {e.strerror}')
-            return ProcessState.FAILURE
+    async def _read_lines(stream: asyncio.StreamReader, on_line: Callable[[str], None]) -> None:
+        """Reads stream in chunks until EOF and passes each stripped, non-empty line to callback"""
+        buffer = b''
 
-        try:
-            while process.poll() is None:
-                line: str = process.stdout.readline().strip()
-                if line:
-                    ProcessManager.log.info(line)
+        while True:
+            chunk: bytes = await stream.read(ProcessManager.chunk_size)
 
-        except KeyboardInterrupt:
-            try:
-                process.terminate()
-            except OSError:
-                ProcessManager.log.error('Process interrupted by user.')
-            return ProcessState.INTERRUPTED
+            if not chunk:
+                break
 
-        return ProcessState.SUCCESS
+            *lines, buffer = (buffer + chunk).split(b'\n')
+
+            for data in lines:
+                line = data.decode(ProcessManager.encoding, errors='replace').strip()
+                if line:
+                    on_line(line)
+
+        # the last line may not end with a newline
+        line = buffer.decode(ProcessManager.encoding, errors='replace').strip()
+        if line:
+            on_line(line)
 
     @staticmethod
-    def run_bsarch(command: str) -> ProcessState:
+    async def _pump(process: asyncio.subprocess.Process, on_line: Callable[[str], None]) -> int:
         """
-        Creates bsarch process and logs output to console
+        Drains stdout and stderr concurrently until EOF, then returns exit code
 
-        :param command: Command to execute, including absolute path to executable and its arguments
-        :return: ProcessState (SUCCESS, FAILURE, INTERRUPTED, ERRORS)
+        Nothing the process writes before it exits is lost, and long lines do not stall the reader.
         """
         try:
-            process = subprocess.Popen(command,
-                                       stdout=subprocess.PIPE,
-                                       stderr=subprocess.STDOUT,
-                                       universal_newlines=True)
-        except WindowsError as e:
+            await asyncio.gather(ProcessManager._read_lines(process.stdout, on_line),
+                                 ProcessManager._read_lines(process.stderr, on_line))
+            return await process.wait()
+        except asyncio.CancelledError:
+            ProcessManager._terminate(process)
+            raise
+
+    @staticmethod
+    def _terminate(process: asyncio.subprocess.Process) -> None:
+        try:
+            process.terminate()
+        except ProcessLookupError:
+            pass
+
+    @staticmethod
+    def _limit_priority(pid: int) -> None:
+        try:
+            process = psutil.Process(pid)
+            process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS if sys.platform == 'win32' else 19)
+        except psutil.Error:
+            pass
+
+    @staticmethod
+    def _run(coroutine: Awaitable) -> ProcessState:
+        try:
+            return asyncio.run(coroutine)
+        except KeyboardInterrupt:
+            ProcessManager.log.error('Process interrupted by user.')
+            return ProcessState.INTERRUPTED
+
+    @staticmethod
+    async def _run_command(command: str, cwd: str, env: dict) -> ProcessState:
+        try:
+            process = await asyncio.create_subprocess_shell(command,
+                                                            stdout=asyncio.subprocess.PIPE,
+                                                            stderr=asyncio.subprocess.PIPE,
+                                                            cwd=cwd,
+                                                            env=env)
+        except OSError as e:
             ProcessManager.log.error(f'Cannot create process because: {e.strerror}')
             return ProcessState.FAILURE
 
+        exit_code = await ProcessManager._pump(process, ProcessManager.log.info)
+
+        if exit_code != 0:
+            ProcessManager.log.error(f'Command failed with exit code {exit_code}')
+            return ProcessState.FAILURE
+
+        return ProcessState.SUCCESS
+
+    @staticmethod
+    def run_command(command: str, cwd: str, env: dict) -> ProcessState:
+        return ProcessManager._run(ProcessManager._run_command(command, cwd, env))
+
+    @staticmethod
+    def _log_bsarch_line(line: str, log: Callable[[str], None]) -> None:
         exclusions = (
             '*',
             '[',
@@ -84,66 +135,86 @@ class ProcessManager:
             'XMem'
         )
 
-        try:
-            while process.poll() is None:
-                line = process.stdout.readline().strip()
+        if line.startswith(exclusions):
+            return
 
-                if line.startswith(exclusions):
-                    continue
+        if line.startswith('Packing'):
+            package_path = line.split(':', 1)[1].strip()
+            log(f'Packaging folder "{package_path}"...')
+            return
 
-                if line.startswith('Packing'):
-                    package_path = line.split(':', 1)[1].strip()
-                    ProcessManager.log.info(f'Packaging folder "{package_path}"...')
-                    continue
+        if line.startswith('Archive Name'):
+            archive_path = line.split(':', 1)[1].strip()
+            log(f'Building "{archive_path}"...')
+            return
 
-                if line.startswith('Archive Name'):
-                    archive_path = line.split(':', 1)[1].strip()
-                    ProcessManager.log.info(f'Building "{archive_path}"...')
-                    continue
+        if line.startswith('Done'):
+            archive_time = line.split('in')[1].strip()[:-1]
+            hours, minutes, seconds = [round(Decimal(n), 3) for n in archive_time.split(':')]
 
-                if line.startswith('Done'):
-                    archive_time = line.split('in')[1].strip()[:-1]
-                    hours, minutes, seconds = [round(Decimal(n), 3) for n in archive_time.split(':')]
+            timecode = ProcessManager._format_time(hours, minutes, seconds)
 
-                    timecode = ProcessManager._format_time(hours, minutes, seconds)
+            log(f'Packaging time: {timecode}')
+            return
 
-                    ProcessManager.log.info(f'Packaging time: {timecode}')
-                    continue
+        log(line)
 
-                if line:
-                    ProcessManager.log.info(line)
+    @staticmethod
+    async def _run_bsarch(arguments: list, log: Callable[[str], None]) -> ProcessState:
+        try:
+            process = await asyncio.create_subprocess_exec(*arguments,
+                                                           stdout=asyncio.subprocess.PIPE,
+                                                           stderr=asyncio.subprocess.PIPE)
+        except OSError as e:
+            ProcessManager.log.error(f'Cannot create process because: {e.strerror}')
+            return ProcessState.FAILURE
 
-        except KeyboardInterrupt:
-            try:
-                process.terminate()
-            except OSError:
-                ProcessManager.log.error('Process interrupted by user.')
-            return ProcessState.INTERRUPTED
+        exit_code = await ProcessManager._pump(process, lambda line: ProcessManager._log_bsarch_line(line, log))
+
+        if exit_code != 0:
+            ProcessManager.log.error(f'BSArch failed with exit code {exit_code}')
+            return ProcessState.FAILURE
 
         return ProcessState.SUCCESS
 
     @staticmethod
-    def run_compiler(command: str) -> ProcessState:
+    def run_bsarch(arguments: list, log: Callable[[str], None] = None) -> ProcessState:
         """
-        Creates compiler process and logs output to console
+        Creates bsarch process and logs output to console
 
-        :param command: Command to execute, including absolute path to executable and its arguments
+        :param arguments: Absolute path to executable and its arguments
+        :param log: Callback for output lines, to log output elsewhere than to console
         :return: ProcessState (SUCCESS, FAILURE, INTERRUPTED, ERRORS)
         """
-        command_size = len(command)
+        return ProcessManager._run(ProcessManager._run_bsarch(arguments, log or ProcessManager.log.info))
+
+    @staticmethod
+    async def run_compiler(arguments: list) -> Tuple[ProcessState, List[CompilerDiagnostic]]:
+        """
+        Creates compiler process, logs output to console, and collects diagnostics
+
+        The whole output is read, so every error is reported, including for batches of scripts.
+
+        :param arguments: Absolute path to executable and its arguments
+        :return: ProcessState (SUCCESS, FAILURE, INTERRUPTED, ERRORS) and compiler diagnostics
+        """
+        diagnostics: list = []
+
+        command_size = len(subprocess.list2cmdline(arguments))
 
         if command_size > 32768:
             ProcessManager.log.error(f'Cannot create process because command exceeds max length: {command_size}')
-            return ProcessState.FAILURE
+            return ProcessState.FAILURE, diagnostics
 
         try:
-            process = subprocess.Popen(command,
-                                       stdout=subprocess.PIPE,
-                                       stderr=subprocess.STDOUT,
-                                       universal_newlines=True)
-        except WindowsError as e:
+            process = await asyncio.create_subprocess_exec(*arguments,
+                                                           stdout=asyncio.subprocess.PIPE,
+                                                           stderr=asyncio.subprocess.PIPE)
+        except OSError as e:
             ProcessManager.log.error(f'Cannot create process because: {e.strerror}')
-            return ProcessState.FAILURE
+            return ProcessState.FAILURE, diagnostics
+
+        ProcessManager._limit_priority(process.pid)
 
         exclusions = (
             'Assembly',
@@ -151,38 +222,42 @@ class ProcessManager:
             'Compilation',
             'Copyright',
             'Failed',
-            'No output',
             'Papyrus',
             'Starting'
         )
 
-        line_error = re.compile(r'(.*)(\(\d+,\d+\)):\s+(.*)')
+        line_error = re.compile(r'(.*)\((\d+),(\d+)\):\s+(.*)')
+        line_no_output = re.compile(r'No output generated for (.+?), compilation failed', flags=re.IGNORECASE)
 
-        try:
-            while process.poll() is None:
-                line = process.stdout.readline().strip()
+        def parse(line: str) -> None:
+            match = line_no_output.search(line)
 
-                if not line or line.startswith(exclusions):
-                    continue
+            if match is not None:
+                diagnostics.append(CompilerDiagnostic(path=match.group(1).strip('"'), message='compilation failed'))
+                return
 
-                match = line_error.search(line)
+            if line.startswith(exclusions):
+                return
 
-                if match is not None:
-                    path, location, message = match.groups()
-                    head, tail = os.path.split(path)
-                    ProcessManager.log.error(f'COMPILATION FAILED: '
-                                             f'{os.path.basename(head)}\\{tail}{location}: {message}')
-                    process.terminate()
-                    return ProcessState.ERRORS
+            match = line_error.search(line)
 
-                if 'error(s)' not in line:
-                    ProcessManager.log.info(line)
+            if match is not None:
+                path, line_number, column, message = match.groups()
+                diagnostic = CompilerDiagnostic(path=path, line=int(line_number), column=int(column), message=message)
+                diagnostics.append(diagnostic)
+                ProcessManager.log.error(f'COMPILATION FAILED: {diagnostic}')
+                return
 
-        except KeyboardInterrupt:
-            try:
-                process.terminate()
-            except OSError:
-                ProcessManager.log.error('Process interrupted by user.')
-            return ProcessState.INTERRUPTED
+            if 'error(s)' not in line:
+                ProcessManager.log.info(line)
 
-        return ProcessState.SUCCESS
+        exit_code = await ProcessManager._pump(process, parse)
+
+        if diagnostics:
+            return ProcessState.ERRORS, diagnostics
+
+        if exit_code != 0:
+            ProcessManager.log.error(f'Compiler failed with exit code {exit_code}')
+            return ProcessState.FAILURE, diagnostics
+
+        return ProcessState.SUCCESS, diagnostics
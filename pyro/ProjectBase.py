@@ -1,7 +1,9 @@
+import hashlib
 import logging
 import os
 import sys
 from typing import List, Union
+from urllib.parse import urlparse
 
 from pyro.Comparators import (endswith,
                               startswith)
@@ -136,6 +138,52 @@ class ProjectBase:
                               relative_root_path=self.project_path,
                               fallback_path=[self.program_path, 'out'])
 
+    def get_manifest_path(self) -> str:
+        """
+        Returns absolute path to build manifest in folder next to output folder
+
+        Used by: PapyrusProject
+        """
+        output_path: str = os.path.normpath(self.options.output_path)
+        return os.path.join(os.path.dirname(output_path), '.pyro', f'{self.project_name}.manifest.json')
+
+    def get_journal_path(self) -> str:
+        """
+        Returns absolute path to journal of folder listings in folder next to project
+
+        Used by: PapyrusProject
+        """
+        return os.path.join(self.project_path, '.pyro', f'{self.project_name}.folders.json')
+
+    def get_snapshot_path(self) -> str:
+        """
+        Returns absolute path to resolved project snapshot in folder next to project
+
+        Used by: PapyrusProject
+        """
+        return os.path.join(self.project_path, '.pyro', f'{self.project_name}.snapshot.json')
+
+    def get_package_manifest_path(self, output_path: str) -> str:
+        """
+        Returns absolute path to manifest of package or zip file in temp folder
+
+        Manifests are kept out of project folders, so they cannot be included in packages or zip files.
+
+        Used by: PackageManager
+        """
+        path_hash: str = hashlib.sha1(os.path.normcase(os.path.normpath(output_path)).encode()).hexdigest()[:8]
+        return os.path.join(self.get_temp_path(), '.pyro', 'packages',
+                            f'{self.project_name}.{os.path.basename(output_path)}.{path_hash}.json')
+
+    def get_stats_path(self) -> str:
+        """
+        Returns absolute path to compile durations in folder next to output folder
+
+        Used by: BuildFacade
+        """
+        output_path: str = os.path.normpath(self.options.output_path)
+        return os.path.join(os.path.dirname(output_path), '.pyro', f'{self.project_name}.stats.json')
+
     # game arguments
     def get_game_path(self, game_type: GameType = None) -> str:
         """
@@ -223,6 +271,26 @@ class ProjectBase:
                               relative_root_path=os.getcwd(),
                               fallback_path=[self.program_path, 'temp'])
 
+    # cache arguments
+    def get_cache_path(self) -> str:
+        """Returns absolute compiled script cache path from arguments"""
+        return self._get_path(self.options.cache_path,
+                              relative_root_path=os.getcwd(),
+                              fallback_path=[self.program_path, 'cache'])
+
+    def get_cache_size(self) -> int:
+        """Returns max size of compiled script cache in megabytes from arguments"""
+        return self.options.cache_size if self.options.cache_size > 0 else 1024
+
+    def get_remote_cache(self) -> str:
+        """Returns remote cache url, or absolute remote cache path, from arguments"""
+        remote_cache: str = self.options.remote_cache
+
+        if not remote_cache or urlparse(remote_cache).scheme in ('http', 'https'):
+            return remote_cache
+
+        return self._get_path(remote_cache, relative_root_path=os.getcwd(), fallback_path='')
+
     # zip arguments
     def get_zip_output_path(self) -> str:
         """Returns absolute zip output path from arguments"""
@@ -18,8 +18,12 @@ class ProjectOptions:
     # build arguments
     ignore_errors: bool = field(init=False, default_factory=bool)
     no_incremental_build: bool = field(init=False, default_factory=bool)
+    no_snapshot: bool = field(init=False, default_factory=bool)
     no_parallel: bool = field(init=False, default_factory=bool)
     worker_limit: int = field(init=False, default_factory=int)
+    watch: bool = field(init=False, default_factory=bool)
+    deterministic_anonymize: bool = field(init=False, default_factory=bool)
+    reproducible: bool = field(init=False, default_factory=bool)
 
     # game arguments
     game_type: GameType = field(init=False, default=None)
@@ -33,9 +37,18 @@ class ProjectOptions:
 
     # bsarch arguments
     bsarch_path: str = field(init=False, default_factory=str)
+    use_bsarch: bool = field(init=False, default_factory=bool)
     package_path: str = field(init=False, default_factory=str)
     temp_path: str = field(init=False, default_factory=str)
 
+    # cache arguments
+    cache_path: str = field(init=False, default_factory=str)
+    cache_size: int = field(init=False, default_factory=int)
+    no_cache: bool = field(init=False, default_factory=bool)
+    remote_cache: str = field(init=False, default_factory=str)
+    remote_cache_token: str = field(init=False, default_factory=str)
+    no_remote_cache_upload: bool = field(init=False, default_factory=bool)
+
     # zip arguments
     zip_compression: str = field(init=False, default_factory=str)
     zip_output_path: str = field(init=False, default_factory=str)
@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+import re
+import sys
+from typing import Iterable, Optional
+
+from pyro.BuildManifest import BuildManifest
+
+
+class ProjectSnapshot:
+    """
+    Persistent copy of a resolved Papyrus Project and the paths discovered from it
+
+    A snapshot is used only while its key and the modification times of the folders
+    searched during discovery match, so that unchanged projects are not re-resolved.
+    """
+    log: logging.Logger = logging.getLogger('pyro')
+
+    version: int = 1
+
+    # environment variables that os.path.expanduser reads
+    home_variables: tuple = ('HOME', 'USERPROFILE', 'HOMEDRIVE', 'HOMEPATH')
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+
+    @staticmethod
+    def _get_program_files() -> list:
+        """Returns names, sizes, and modification times of Pyro files, which change when Pyro is updated"""
+        results: list = []
+
+        for path in (sys.executable, os.path.dirname(__file__)):
+            try:
+                if os.path.isdir(path):
+                    with os.scandir(path) as entries:
+                        results.extend((entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+                                       for entry in entries if entry.name.endswith(('.py', '.xsd')))
+                else:
+                    results.append((path, os.path.getsize(path), os.stat(path).st_mtime_ns))
+            except OSError:
+                continue
+
+        return sorted(results)
+
+    @staticmethod
+    def _get_environment(text: str) -> dict:
+        """Returns environment variables that may be expanded in project text"""
+        names: set = {name for match in re.findall(r'\$\{?(\w+)|%(\w+)%', text) for name in match if name}
+        names.update(ProjectSnapshot.home_variables)
+        return {name: os.environ.get(name) for name in sorted(names)}
+
+    @staticmethod
+    def create_key(input_path: str, options: dict) -> str:
+        """Returns key of everything that affects how the project resolves, other than the file system"""
+        with open(input_path, encoding='utf-8') as f:
+            text: str = f.read()
+
+        return BuildManifest.create_key(version=ProjectSnapshot.version,
+                                        program=ProjectSnapshot._get_program_files(),
+                                        project=text,
+                                        environment=ProjectSnapshot._get_environment(text),
+                                        options={key: repr(value) for key, value in options.items()},
+                                        cwd=os.getcwd())
+
+    @staticmethod
+    def _get_folder_times(folder_paths: Iterable[str]) -> dict:
+        """Returns modification times of folders, which change when files are added, removed, or renamed"""
+        results: dict = {}
+
+        for folder_path in folder_paths:
+            try:
+                results[folder_path] = os.stat(folder_path).st_mtime_ns
+            except OSError:
+                results[folder_path] = None
+
+        return results
+
+    def load(self, key: str) -> Optional[dict]:
+        """Returns saved state if snapshot is current, or None"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data: dict = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            ProjectSnapshot.log.warning(f'Cannot load project snapshot: "{self.path}" ({e})')
+            return None
+
+        if data.get('version') != self.version or data.get('key') != key:
+            return None
+
+        folder_times: dict = data.get('folders', {})
+        if self._get_folder_times(folder_times.keys()) != folder_times:
+            return None
+
+        return data.get('state')
+
+    def save(self, key: str, state: dict, folder_paths: Iterable[str]) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        data: dict = {
+            'version': self.version,
+            'key': key,
+            'folders': self._get_folder_times(sorted(set(folder_paths))),
+            'state': state
+        }
+
+        temp_path = f'{self.path}.tmp'
+
+        try:
+            with open(temp_path, mode='w', encoding='utf-8') as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            ProjectSnapshot.log.warning(f'Cannot save project snapshot: "{self.path}" ({e.strerror})')
@@ -0,0 +1,23 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class PscInfo:
+    path: str = field(default_factory=str)
+    object_name: str = field(default_factory=str)
+    parent_name: str = field(default_factory=str)
+    imports: list = field(default_factory=list)
+    references: set = field(default_factory=set)
+
+    @property
+    def dependencies(self) -> set:
+        """Returns casefolded names of all scripts referenced by this script, excluding itself"""
+        names: set = {name.casefold() for name in self.references}
+        names.update(name.casefold() for name in self.imports)
+
+        if self.parent_name:
+            names.add(self.parent_name.casefold())
+
+        names.discard(self.object_name.casefold())
+
+        return names
@@ -0,0 +1,70 @@
+import os
+import re
+
+from pyro.PscInfo import PscInfo
+
+
+class PscScanner:
+    """
+    Lightweight scanner for Papyrus source files
+
+    This is not a parser. It collects names that may refer to other scripts
+    (parent script, imports, and types used in declarations, casts, and static calls)
+    so that unknown names can be discarded later when they are resolved against import paths.
+    """
+    comment_pattern = re.compile(r';/.*?/;|;[^\n]*|\{.*?\}', flags=re.DOTALL)
+    string_pattern = re.compile(r'"(?:\\.|[^"\\\n])*"')
+    continuation_pattern = re.compile(r'\\[ \t]*\r?\n')
+
+    script_name_pattern = re.compile(r'^[ \t]*scriptname[ \t]+([A-Za-z_][\w:]*)(?:[ \t]+extends[ \t]+([A-Za-z_][\w:]*))?',
+                                     flags=re.IGNORECASE | re.MULTILINE)
+    import_pattern = re.compile(r'^[ \t]*import[ \t]+([A-Za-z_][\w:]*)', flags=re.IGNORECASE | re.MULTILINE)
+
+    # Fallout 4 struct types are written as Script#Struct, where the script is the reference
+    # e.g., "Actor Property PlayerRef Auto", "ObjectReference[] kRefs", "MyLib:Points#Point P"
+    declaration_pattern = re.compile(r'(?<![\w:.#])([A-Za-z_][\w:]*)(?:#[A-Za-z_]\w*)?(?:[ \t]*\[[ \t]*\])?[ \t]+(?=[A-Za-z_])')
+    # e.g., "akTarget as Actor", "new Weapon[10]", "akTarget is Actor", "new Other#S"
+    operator_pattern = re.compile(r'(?<![\w:.#])(?:as|new|is)[ \t]+([A-Za-z_][\w:]*)', flags=re.IGNORECASE)
+    # e.g., "Game.GetPlayer()", "Debug.Trace(...)"
+    static_call_pattern = re.compile(r'(?<![\w:.#])([A-Za-z_][\w:]*)[ \t]*\.[ \t]*[A-Za-z_]\w*[ \t]*\(')
+
+    keywords: frozenset = frozenset((
+        'and', 'as', 'auto', 'autoreadonly', 'betaonly', 'bool', 'collapsed', 'collapsedonref', 'collapsedonbase',
+        'conditional', 'const', 'customevent', 'debugonly', 'default', 'else', 'elseif', 'endevent', 'endfunction',
+        'endgroup', 'endif', 'endproperty', 'endstate', 'endstruct', 'endwhile', 'event', 'extends', 'false',
+        'float', 'function', 'global', 'group', 'hidden', 'if', 'import', 'int', 'is', 'length', 'mandatory',
+        'native', 'new', 'none', 'not', 'or', 'parent', 'property', 'return', 'scriptname', 'self', 'state',
+        'string', 'struct', 'true', 'var', 'while'
+    ))
+
+    @staticmethod
+    def strip_source(source: str) -> str:
+        """Returns source text without comments, string literals, and line continuations"""
+        source = PscScanner.string_pattern.sub('""', source)
+        source = PscScanner.comment_pattern.sub('', source)
+        return PscScanner.continuation_pattern.sub(' ', source)
+
+    @staticmethod
+    def scan(path: str) -> PscInfo:
+        """Returns names of scripts referenced by source file"""
+        # latin-1 never fails to decode and preserves every ascii keyword and identifier
+        with open(path, encoding='latin-1') as f:
+            source: str = PscScanner.strip_source(f.read())
+
+        info = PscInfo(path=path)
+
+        match = PscScanner.script_name_pattern.search(source)
+        if match is not None:
+            info.object_name, parent_name = match.groups()
+            info.parent_name = parent_name or ''
+        else:
+            info.object_name, _ = os.path.splitext(os.path.basename(path))
+
+        info.imports = PscScanner.import_pattern.findall(source)
+
+        for pattern in (PscScanner.declaration_pattern, PscScanner.operator_pattern, PscScanner.static_call_pattern):
+            for name in pattern.findall(source):
+                if name.casefold() not in PscScanner.keywords:
+                    info.references.add(name)
+
+        return info
@@ -0,0 +1,177 @@
+import logging
+import os
+import shutil
+import uuid
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlparse
+from urllib.request import Request, urlopen
+
+
+class RemoteCacheBase:
+    """
+    Shared store of compiled scripts keyed by compile key
+
+    Implementations only fetch and store single artifacts. Failures are logged and
+    treated as misses, and the cache stops being used after it becomes unreachable,
+    so that builds never fail or stall because of the cache.
+    """
+    log: logging.Logger = logging.getLogger('pyro')
+
+    def __init__(self, location: str) -> None:
+        self.location: str = location
+        self.available: bool = True
+
+    @staticmethod
+    def create(location: str, access_token: str = '') -> 'RemoteCacheBase':
+        """Returns remote cache for URL or folder path"""
+        if urlparse(location).scheme in ('http', 'https'):
+            return HttpRemoteCache(location, access_token)
+        return DirectoryRemoteCache(location)
+
+    def _disable(self, reason: object) -> None:
+        """Stops using remote cache for the rest of the build"""
+        if self.available:
+            self.available = False
+            RemoteCacheBase.log.warning(f'Cannot use remote cache, disabling remote cache: "{self.location}" ({reason})')
+
+    @staticmethod
+    def _get_artifact_name(key: str) -> str:
+        return f'{key[:2]}/{key}.pex'
+
+    @staticmethod
+    def _write_atomic(data: bytes, target_path: str) -> None:
+        temp_path = f'{target_path}.{uuid.uuid4().hex}.tmp'
+
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+
+        try:
+            with open(temp_path, mode='wb') as f:
+                f.write(data)
+            os.replace(temp_path, target_path)
+        finally:
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+
+    def fetch(self, key: str, target_path: str) -> bool:
+        """Downloads artifact for key to target path and returns True, or returns False if not cached"""
+        raise NotImplementedError
+
+    def store(self, key: str, source_path: str) -> None:
+        """Uploads compiled script as artifact for key"""
+        raise NotImplementedError
+
+
+class DirectoryRemoteCache(RemoteCacheBase):
+    """Remote cache in a folder, such as a network share"""
+
+    def fetch(self, key: str, target_path: str) -> bool:
+        if not self.available:
+            return False
+
+        artifact_path: str = os.path.join(self.location, *self._get_artifact_name(key).split('/'))
+
+        try:
+            with open(artifact_path, mode='rb') as f:
+                data: bytes = f.read()
+            self._write_atomic(data, target_path)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            if os.path.isdir(self.location):
+                RemoteCacheBase.log.warning(f'Cannot fetch artifact from remote cache: "{artifact_path}" ({e.strerror})')
+            else:
+                self._disable(e.strerror)
+            return False
+
+        return True
+
+    def store(self, key: str, source_path: str) -> None:
+        if not self.available:
+            return
+
+        artifact_path: str = os.path.join(self.location, *self._get_artifact_name(key).split('/'))
+
+        if os.path.isfile(artifact_path):
+            return
+
+        temp_path = f'{artifact_path}.{uuid.uuid4().hex}.tmp'
+
+        try:
+            os.makedirs(os.path.dirname(artifact_path), exist_ok=True)
+            shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, artifact_path)
+        except OSError as e:
+            self._disable(e.strerror)
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+class HttpRemoteCache(RemoteCacheBase):
+    """Remote cache on a server that serves artifacts with GET and accepts them with PUT"""
+    timeout: int = 30
+
+    def __init__(self, location: str, access_token: str = '') -> None:
+        super(HttpRemoteCache, self).__init__(location.rstrip('/'))
+        self.access_token: str = access_token
+
+    def _create_request(self, key: str, method: str, data: bytes = None) -> Request:
+        request = Request(f'{self.location}/{self._get_artifact_name(key)}', data=data, method=method)
+
+        if self.access_token:
+            request.add_header('Authorization', f'Bearer {self.access_token}')
+
+        if data is not None:
+            request.add_header('Content-Type', 'application/octet-stream')
+
+        return request
+
+    def fetch(self, key: str, target_path: str) -> bool:
+        if not self.available:
+            return False
+
+        request = self._create_request(key, 'GET')
+
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                data: bytes = response.read()
+        except HTTPError as e:
+            if e.code != 404:
+                RemoteCacheBase.log.warning(f'Cannot fetch artifact from remote cache ({e.code}): "{request.full_url}"')
+            return False
+        except (URLError, OSError) as e:
+            self._disable(e)
+            return False
+
+        try:
+            self._write_atomic(data, target_path)
+        except OSError as e:
+            RemoteCacheBase.log.warning(f'Cannot write artifact from remote cache: "{target_path}" ({e.strerror})')
+            return False
+
+        return True
+
+    def store(self, key: str, source_path: str) -> None:
+        if not self.available:
+            return
+
+        try:
+            with open(source_path, mode='rb') as f:
+                data: bytes = f.read()
+        except OSError as e:
+            RemoteCacheBase.log.warning(f'Cannot read artifact for remote cache: "{source_path}" ({e.strerror})')
+            return
+
+        request = self._create_request(key, 'PUT', data)
+
+        try:
+            with urlopen(request, timeout=self.timeout):
+                pass
+        except HTTPError as e:
+            if e.code in (401, 403, 405):
+                self._disable(f'{e.code} {e.reason}')
+            else:
+                RemoteCacheBase.log.warning(f'Cannot store artifact in remote cache ({e.code}): "{request.full_url}"')
+        except (URLError, OSError) as e:
+            self._disable(e)
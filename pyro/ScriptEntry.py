@@ -0,0 +1,43 @@
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+from pyro.PexHeader import PexHeader
+from pyro.PexReader import PexReader
+
+
+@dataclass
+class ScriptEntry:
+    object_name: str = field(default_factory=str)
+    psc_path: str = field(default_factory=str)
+    pex_path: str = field(default_factory=str)
+
+    _pex_stat: Optional[os.stat_result] = field(default=None, repr=False)
+    _pex_header: Optional[PexHeader] = field(default=None, repr=False)
+
+    def get_pex_stat(self) -> Optional[os.stat_result]:
+        """Returns cached stat result of compiled script, or None if it does not exist"""
+        if self._pex_stat is None:
+            try:
+                self._pex_stat = os.stat(self.pex_path)
+            except OSError:
+                return None
+        return self._pex_stat
+
+    def get_pex_header(self) -> Optional[PexHeader]:
+        """Returns cached header of compiled script, read on first use, or None if it cannot be read"""
+        if self._pex_header is None:
+            try:
+                self._pex_header = PexReader.get_header(self.pex_path)
+            except (OSError, ValueError):
+                return None
+        return self._pex_header
+
+    def forget_pex(self) -> None:
+        """Forgets cached stat result and header after compiled script is written"""
+        self._pex_stat = None
+        self._pex_header = None
+
+    @property
+    def has_pex(self) -> bool:
+        return self.get_pex_stat() is not None
@@ -0,0 +1,73 @@
+import logging
+import os
+from typing import Dict, Iterator, Optional
+
+from pyro.ScriptEntry import ScriptEntry
+
+
+class ScriptIndex:
+    """
+    Project scripts keyed case-insensitively by object name, with lookups by source script path
+
+    Fallout 4 object names include namespaces. Skyrim scripts are compiled into the
+    output folder without their source folders, so only the script name is used.
+    """
+    log: logging.Logger = logging.getLogger('pyro')
+
+    def __init__(self, output_path: str, *, namespaced: bool) -> None:
+        self.output_path: str = output_path
+        self.namespaced: bool = namespaced
+
+        self._entries: Dict[str, ScriptEntry] = {}
+        self._keys_by_psc: Dict[str, str] = {}
+
+    @staticmethod
+    def _normalize_path(path: str) -> str:
+        return os.path.normcase(os.path.normpath(path))
+
+    def normalize_object_name(self, object_name: str) -> str:
+        """Returns casefolded object name without extension, with namespaces delimited by colons"""
+        object_name, extension = os.path.splitext(object_name.replace('/', ':').replace('\\', ':'))
+
+        if extension.casefold() not in ('.psc', '.pex'):
+            object_name += extension
+
+        if not self.namespaced:
+            object_name = object_name.rsplit(':', 1)[-1]
+
+        return object_name.casefold()
+
+    def add(self, object_name: str, psc_path: str) -> Optional[ScriptEntry]:
+        """Adds script and returns its entry, or returns None if another script has the same object name"""
+        key = self.normalize_object_name(object_name)
+
+        existing_entry = self._entries.get(key)
+        if existing_entry is not None:
+            if self._normalize_path(existing_entry.psc_path) != self._normalize_path(psc_path):
+                ScriptIndex.log.warning(f'Cannot compile "{psc_path}" because "{existing_entry.psc_path}" '
+                                        f'compiles to the same script: "{existing_entry.pex_path}"')
+            return None
+
+        if self.namespaced:
+            relative_pex_path = f'{os.path.splitext(object_name)[0]}.pex'
+        else:
+            relative_pex_path = f'{os.path.splitext(os.path.basename(object_name))[0]}.pex'
+
+        entry = ScriptEntry(object_name=object_name,
+                            psc_path=psc_path,
+                            pex_path=os.path.join(self.output_path, relative_pex_path))
+
+        self._entries[key] = entry
+        self._keys_by_psc[self._normalize_path(psc_path)] = key
+
+        return entry
+
+    def get_by_psc(self, psc_path: str) -> Optional[ScriptEntry]:
+        key = self._keys_by_psc.get(self._normalize_path(psc_path))
+        return self._entries[key] if key is not None else None
+
+    def __iter__(self) -> Iterator[ScriptEntry]:
+        return iter(self._entries.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -2,7 +2,7 @@ import os
 import sys
 from argparse import SUPPRESS
 
-from pyro.Application import Application
+from pyro.BuildClient import BuildClient
 from pyro.Enums.GameType import GameType
 from pyro.Enums.ZipCompression import ZipCompression
 from pyro.PyroArgumentParser import PyroArgumentParser
@@ -36,6 +36,10 @@ if __name__ == '__main__':
     _build_arguments.add_argument('--no-incremental-build',
                                   action='store_true', default=False,
                                   help='do not build incrementally')
+    _build_arguments.add_argument('--no-snapshot',
+                                  action='store_true', default=False,
+                                  help='do not reuse project or folder listings\n'
+                                       'from previous build')
     _build_arguments.add_argument('--no-parallel',
                                   action='store_true', default=False,
                                   help='do not parallelize compilation')
@@ -43,6 +47,19 @@ if __name__ == '__main__':
                                   action='store', type=int,
                                   help='max workers for parallel compilation\n'
                                        '(usually set automatically to processor count)')
+    _build_arguments.add_argument('--watch',
+                                  action='store_true', default=False,
+                                  help='rebuild when scripts or project change\n'
+                                       '(press Ctrl+C to stop)')
+    _build_arguments.add_argument('--deterministic-anonymize',
+                                  action='store_true', default=False,
+                                  help='derive anonymized names from script inputs\n'
+                                       'instead of generating random names')
+    _build_arguments.add_argument('--reproducible',
+                                  action='store_true', default=False,
+                                  help='replace compilation times, source paths, and\n'
+                                       'user and computer names in compiled scripts\n'
+                                       'with stable values')
 
     _compiler_arguments = _parser.add_argument_group('compiler arguments')
     _compiler_arguments.add_argument('--compiler-path',
@@ -79,6 +96,10 @@ if __name__ == '__main__':
                                    action='store', type=str,
                                    help='relative or absolute path to bsarch.exe\n'
                                         '(if relative, must be relative to current working directory)')
+    _bsarch_arguments.add_argument('--use-bsarch',
+                                   action='store_true', default=False,
+                                   help='create packages with bsarch instead of\n'
+                                        'the built-in archive writers')
     _bsarch_arguments.add_argument('--package-path',
                                    action='store', type=str,
                                    help='relative or absolute path to bsa/ba2 output folder\n'
@@ -88,6 +109,29 @@ if __name__ == '__main__':
                                    help='relative or absolute path to temp folder\n'
                                         '(if relative, must be relative to current working directory)')
 
+    _cache_arguments = _parser.add_argument_group('cache arguments')
+    _cache_arguments.add_argument('--cache-path',
+                                  action='store', type=str,
+                                  help='relative or absolute path to compiled script cache folder\n'
+                                       '(if relative, must be relative to current working directory)')
+    _cache_arguments.add_argument('--cache-size',
+                                  action='store', type=int,
+                                  help='max size of compiled script cache in megabytes (default: 1024)')
+    _cache_arguments.add_argument('--no-cache',
+                                  action='store_true', default=False,
+                                  help='do not restore or store compiled scripts in cache')
+    _cache_arguments.add_argument('--remote-cache',
+                                  action='store', type=str,
+                                  help='url or path to shared compiled script cache\n'
+                                       '(if url, server must support GET and PUT)\n'
+                                       '(if relative, must be relative to current working directory)')
+    _cache_arguments.add_argument('--remote-cache-token',
+                                  action='store', type=str,
+                                  help='bearer token for remote cache server')
+    _cache_arguments.add_argument('--no-remote-cache-upload',
+                                  action='store_true', default=False,
+                                  help='restore compiled scripts from remote cache without uploading')
+
     _zip_arguments = _parser.add_argument_group('zip arguments')
     _zip_arguments.add_argument('--zip-compression',
                                 action='store', type=ZipCompression,
@@ -124,5 +168,26 @@ if __name__ == '__main__':
     _program_arguments.add_argument('--help', dest='show_help',
                                     action='store_true', default=False,
                                     help='show help and exit')
+    _program_arguments.add_argument('--daemon',
+                                    action='store_true', default=False,
+                                    help='run build server that keeps projects loaded between builds\n'
+                                         '(later builds are sent to the build server while it runs)')
+    _program_arguments.add_argument('--no-daemon',
+                                    action='store_true', default=False,
+                                    help='build in this process even if build server is running')
+
+    _argv: list = sys.argv[1:]
+
+    # send build to build server, if one is running
+    if _argv and set(_argv).isdisjoint(('--daemon', '--no-daemon', '--help', '--watch')):
+        _exit_code = BuildClient.try_forward(_argv, os.getcwd())
+        if _exit_code is not None:
+            sys.exit(_exit_code)
+
+    # build modules are imported late, so that builds sent to the build server do not load them
+    if '--daemon' in _argv:
+        from pyro.BuildServer import BuildServer
+        sys.exit(BuildServer(_parser).serve_forever())
 
+    from pyro.Application import Application
     Application(_parser).run()